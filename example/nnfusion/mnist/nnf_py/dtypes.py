@@ -12,41 +12,41 @@ c_int_p_p = ctypes.POINTER(ctypes.POINTER(ctypes.c_int))
 c_int64 = ctypes.c_int64
 c_int64_p = ctypes.POINTER(ctypes.c_int64)
 
+# ctypes pointer type for each supported tensor dtype
+_PTR_T = {
+    torch.float32: c_float_p,
+    torch.int32: c_int_p,
+    torch.int64: c_int64_p,
+}
 
-def tensor_ptr(tensor):
-    tensor_addr = tensor.storage().data_ptr()
-    tensor_ptr = None
-    if tensor.dtype is torch.float32:
-        tensor_ptr = ctypes.cast(tensor_addr, c_float_p)
-    else:
-        if tensor.dtype is torch.int32:
-            tensor_ptr = ctypes.cast(tensor_addr, c_int_p)
-        else:
-            if tensor.dtype is torch.int64:
-                tensor_ptr = ctypes.cast(tensor_addr, c_int64_p)
-            else:
-                raise Exception("Dtype is not suppported: %s" % (tensor.dtype))
-    return tensor_ptr
-
-
-def deduce_signatrue(tensors):
-    sig = []
-    for p in tensors:
-        if p.dtype is torch.float32:
-            sig.append(c_float_p)
-        else:
-            if p.dtype is torch.int32:
-                sig.append(c_int_p)
-            else:
-                if p.dtype is torch.int64:
-                    sig.append(c_int64_p)
-                else:
-                    raise Exception("Dtype is not suppported: %s" % (p.dtype))
-    return tuple(sig)
-
-
-def get_data_addr(tensors):
-    addr = []
-    for p in tensors:
-        addr.append(tensor_ptr(p))
-    return tuple(addr)
+
+def _ptr_type(dtype):
+    ptr_type = _PTR_T.get(dtype)
+    if ptr_type is None:
+        raise Exception("Dtype is not suppported: %s" % (dtype))
+    return ptr_type
+
+
+class KernelBinding:
+    """ Addresses of a fixed tensor layout, resolved once at bind time.
+        NNFusion kernels are compiled for fixed input dtypes, so the
+        dtypes are validated here and each call only writes data_ptr()
+        into a preallocated c_void_p array.
+    """
+
+    def __init__(self, dtypes):
+        self.dtypes = tuple(dtypes)
+        for dtype in self.dtypes:
+            _ptr_type(dtype)
+        self.argtypes = (ctypes.c_void_p, ) * len(self.dtypes)
+        self.__addr = (ctypes.c_void_p * len(self.dtypes))()
+
+    def addrs(self, tensors):
+        assert len(tensors) == len(self.dtypes), \
+            "expect %d tensors, got %d" % (len(self.dtypes), len(tensors))
+        addr = self.__addr
+        for i, p in enumerate(tensors):
+            # data_ptr() is the start of the view, the kernel reads it densely
+            assert p.is_contiguous(), "tensor must be contiguous"
+            addr[i] = p.data_ptr()
+        return addr
@@ -36,6 +36,7 @@ class Runtime:
         # member of session
         self.libnnf_path = libnnf_rt
         self.libnnf = libnnf
+        self.binding = None
 
     # call for init session
     def init(self, plan_file_path):
@@ -55,12 +56,20 @@ class Runtime:
         return world_size.value
 
     def feed(self, tensors=[], signature=(), params=()):
-        if tensors is not []:
-            self.libnnf.argtypes = dtypes.deduce_signatrue(tensors)
-            self.libnnf.kernel_entry(*(dtypes.get_data_addr(tensors)))
+        kernel_entry = self.libnnf.kernel_entry
+        if tensors:
+            # a binding serves one dtype layout, rebind when it changes
+            layout = tuple(p.dtype for p in tensors)
+            if self.binding is None or self.binding.dtypes != layout:
+                self.binding = dtypes.KernelBinding(layout)
+            # raw addresses need argtypes on the entry itself, otherwise
+            # ctypes would narrow them to C ints
+            if kernel_entry.argtypes is not self.binding.argtypes:
+                kernel_entry.argtypes = self.binding.argtypes
+            kernel_entry(*(self.binding.addrs(tensors)))
         else:
-            self.libnnf.argtypes = signature
-            self.libnnf.kernel_entry(*params)
+            kernel_entry.argtypes = signature or None
+            kernel_entry(*params)
 
     def free(self):
         if "cpu" in self.libnnf_path:
@@ -70,3 +79,4 @@ class Runtime:
 
         del self.libnnf
         del self.libnnf_path
+        del self.binding
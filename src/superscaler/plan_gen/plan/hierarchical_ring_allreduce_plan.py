@@ -0,0 +1,144 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from collections import OrderedDict
+from superscaler.plan_gen.plan.ring_allreduce_plan import RingAllreducePlan
+
+
+class HierarchicalRingAllreducePlan(RingAllreducePlan):
+    """ A ring allreduce plan aware of the hosts of devices.
+        Gradients are reduce-scattered in a ring inside each host, each
+        reduced chunk is allreduced in a ring across hosts, then gathered
+        back in a ring inside each host. Only 1/P_local of the gradients
+        crosses the inter-host links compared with the flat ring.
+    """
+
+    def __init__(self,
+                 plan_name="Hierarchical_Ring_Allreduce_Plan",
+                 device_hosts=None):
+        ''' Init a plan with name and the host of each device
+        Args:
+            plan_name: string, e.g. hierarchical_ring
+            device_hosts: dict, mapping each device of node list to the
+                host it runs on, devices not found are treated as being
+                on the same host
+        '''
+        super().__init__(plan_name=plan_name)
+        self.__device_hosts = device_hosts if device_hosts else {}
+
+    def separate_allreduce_node(self, node, endpoint):
+        '''
+        Separating allreduce node includes five step:
+        1. Reduce-scatter in a ring among the ranks of the same host
+        2. Reduce-scatter the owned chunk in a ring across hosts
+        3. Allgather the owned chunk in a ring across hosts
+        4. Allgather in a ring among the ranks of the same host
+        5. Remove the original allreduce node from node list
+        It falls back to the flat ring when there is a single host, a single
+        rank per host, or hosts with different rank counts
+
+        Args:
+            node: dict, the node with allreduce op
+            endpoint: list, all node enrolled in the same allreduce operator
+        '''
+        # Group endpoint nodes by host, keeping the rank order
+        hosts = OrderedDict()
+        for endpoint_node in endpoint:
+            host = self.__device_hosts.get(endpoint_node.device)
+            hosts.setdefault(host, []).append(endpoint_node)
+        groups = list(hosts.values())
+        nLocalRanks = len(groups[0])
+        if len(groups) == 1 or nLocalRanks == 1 or \
+           any(len(group) != nLocalRanks for group in groups):
+            return super().separate_allreduce_node(node, endpoint)
+
+        # All generated nodes are inserted into the index of orignal
+        # allreduce node in order
+        node_index = self._get_node_list().index(node)
+        input_name = None
+
+        # numElements of gradients for ring_allreduce
+        numElements = 1
+        for shape in node.output_shapes[0]:
+            numElements *= shape
+
+        # Locate the node by its host and its rank inside the host
+        nHosts = len(groups)
+        myHost = [index for index, group in enumerate(groups)
+                  if node in group][0]
+        myLocalRank = groups[myHost].index(node)
+
+        # Intra-host reduce-scatter: each rank ends up owning the host-wide
+        # reduction of the chunk (myLocalRank + 1) % nLocalRanks
+        localGroup = groups[myHost]
+        localSendTarget = localGroup[(myLocalRank + 1) % nLocalRanks].device
+        localRecvTarget = \
+            localGroup[(myLocalRank + nLocalRanks - 1) % nLocalRanks].device
+        localSizes = [numElements // nLocalRanks +
+                      (i < numElements % nLocalRanks)
+                      for i in range(nLocalRanks)]
+        localOffsets = [sum(localSizes[:i]) for i in range(nLocalRanks)]
+        node_index, input_name, localSendIndex, localReceiveIndex = \
+            self._generate_ring_steps(
+                node=node,
+                node_index=node_index,
+                input_name=input_name,
+                phase='local_scatter',
+                reduction='sum',
+                sendTarget=localSendTarget,
+                recvTarget=localRecvTarget,
+                offsets=localOffsets,
+                chunkSizes=localSizes,
+                sendIndex=myLocalRank,
+                receiveIndex=(myLocalRank + nLocalRanks - 1) % nLocalRanks)
+
+        # Inter-host allreduce of the owned chunk among the ranks holding
+        # the same chunk on every host
+        ownedSize = localSizes[localSendIndex]
+        ownedOffset = localOffsets[localSendIndex]
+        interSendTarget = groups[(myHost + 1) % nHosts][myLocalRank].device
+        interRecvTarget = \
+            groups[(myHost + nHosts - 1) % nHosts][myLocalRank].device
+        interSizes = [ownedSize // nHosts + (i < ownedSize % nHosts)
+                      for i in range(nHosts)]
+        interOffsets = [ownedOffset + sum(interSizes[:i])
+                        for i in range(nHosts)]
+        node_index, input_name, interSendIndex, interReceiveIndex = \
+            self._generate_ring_steps(
+                node=node,
+                node_index=node_index,
+                input_name=input_name,
+                phase='inter_scatter',
+                reduction='sum',
+                sendTarget=interSendTarget,
+                recvTarget=interRecvTarget,
+                offsets=interOffsets,
+                chunkSizes=interSizes,
+                sendIndex=myHost,
+                receiveIndex=(myHost + nHosts - 1) % nHosts)
+        node_index, input_name, _, _ = \
+            self._generate_ring_steps(node=node,
+                                      node_index=node_index,
+                                      input_name=input_name,
+                                      phase='inter_allgather',
+                                      reduction='copy',
+                                      sendTarget=interSendTarget,
+                                      recvTarget=interRecvTarget,
+                                      offsets=interOffsets,
+                                      chunkSizes=interSizes,
+                                      sendIndex=interSendIndex,
+                                      receiveIndex=interReceiveIndex)
+
+        # Intra-host allgather of the fully reduced chunks
+        self._generate_ring_steps(node=node,
+                                  node_index=node_index,
+                                  input_name=input_name,
+                                  phase='local_allgather',
+                                  reduction='copy',
+                                  sendTarget=localSendTarget,
+                                  recvTarget=localRecvTarget,
+                                  offsets=localOffsets,
+                                  chunkSizes=localSizes,
+                                  sendIndex=localSendIndex,
+                                  receiveIndex=localReceiveIndex)
+        self._get_node_list().remove(node)
@@ -3,7 +3,7 @@
 
 import tensorflow as tf
 from tensorflow.core.framework import node_def_pb2
-from google.protobuf import text_format
+from google.protobuf import message, text_format
 from superscaler.plan_gen.plan.parser.DAG_parser import DAGParser
 from superscaler.plan_gen.plan.parser.profiler.profiler import TFProfiler
 from superscaler.plan_gen.plan.parser.profiler.database_backend import \
@@ -188,8 +188,17 @@ class TFParser(DAGParser):
         '''
         Load protobuf from memory
         Return the protobuf
-        graph_content: string description of graph
+        graph_content: string description of graph, or bytes of the
+            serialized graph
         '''
+        if isinstance(graph_content, bytes):
+            graph_def = tf.compat.v1.GraphDef()
+            try:
+                graph_def.ParseFromString(graph_content)
+            except message.DecodeError as e:
+                raise ParserError("Cannot parse description: %s." %
+                                  (str(e)))
+            return graph_def
         try:
             graph_def = text_format.Parse(graph_content,
                                           tf.compat.v1.GraphDef())
@@ -204,8 +213,19 @@ class TFParser(DAGParser):
         '''
         Load protobuf from file
         Return the protobuf
-        filename: path to protobuf
+        filename: path to protobuf, a .pb file holds the serialized graph
+            and any other file the text format
         '''
+        if filename.endswith('.pb'):
+            with open(filename, 'rb') as f:
+                file_content = f.read()
+            graph_def = tf.compat.v1.GraphDef()
+            try:
+                graph_def.ParseFromString(file_content)
+            except message.DecodeError as e:
+                raise ParserError("Cannot parse file %s: %s." %
+                                  (filename, str(e)))
+            return graph_def
         graph_def = None
         with open(filename, 'r') as f:
             file_content = f.read()
@@ -13,22 +13,28 @@ v0.1 supported function:
 Introduce import package.
 '''
 
-from superscaler.plan_gen.plan.plan_mapper import GPURoundRobinMapper
+from superscaler.plan_gen.plan.plan_mapper import GPURoundRobinMapper, \
+     LoadAwareGPURoundRobinMapper
 from superscaler.plan_gen.plan.plan_pool import PlanPool
 from superscaler.plan_gen.plan.ring_allreduce_plan import RingAllreducePlan
 from superscaler.plan_gen.plan.reduce_broadcast_allreduce_plan import \
      ReduceBroadcastAllreducePlan
+from superscaler.plan_gen.plan.hierarchical_ring_allreduce_plan import \
+     HierarchicalRingAllreducePlan
 from superscaler.plan_gen.plan.plan_manager import PlanManager
+from superscaler.plan_gen.plan.node_list import NodeList
 
 
 class PlanGenerator():
-    def __init__(self, nodelist, resource_pool):
+    def __init__(self, nodelist, resource_pool, strategy='rr'):
         ''' Init PlanGenerator with nodelist and a resource_pool
 
         Args:
             nodelist: a list node parsed from machine learning platform
             resource_pool: a ResourcePool class containing device info and
                 router info
+            strategy: 'rr' maps devices on GPUs in RoundRobin order, 'load'
+                maps the most loaded devices on the fastest GPUs
         '''
 
         # Init resource_pool
@@ -36,15 +42,45 @@ class PlanGenerator():
         # Init nodelist
         self.__nodelist = nodelist
         # Init PlanPool
+        # Plans are only built when get_execution_plan asks for them
         self.__plan_pool = PlanPool()
-        self.__plan_pool.add_plan(RingAllreducePlan(plan_name='ring'))
-        self.__plan_pool.add_plan(
-            ReduceBroadcastAllreducePlan(plan_name='ReduceBroadcast'))
+        self.register_plan('Allreduce', 'ring',
+                           lambda: RingAllreducePlan(plan_name='ring'))
+        self.register_plan(
+            'Allreduce', 'segmented_ring',
+            lambda: RingAllreducePlan(plan_name='segmented_ring',
+                                      segment_bytes=1 << 20))
+        self.register_plan(
+            'Allreduce', 'ReduceBroadcast',
+            lambda: ReduceBroadcastAllreducePlan(plan_name='ReduceBroadcast'))
+        self.register_plan(
+            'Allreduce', 'hierarchical_ring',
+            lambda: HierarchicalRingAllreducePlan(
+                plan_name='hierarchical_ring',
+                device_hosts=self.__get_device_hosts()))
         # Init plan mapper
-        # TODO Introduce mapping plan here
-        self.__mapper = GPURoundRobinMapper(resource_pool)
+        if strategy == 'rr':
+            self.__mapper = GPURoundRobinMapper(resource_pool)
+        elif strategy == 'load':
+            self.__mapper = LoadAwareGPURoundRobinMapper(resource_pool)
+        else:
+            raise ValueError("Invalid mapping strategy: %s" % strategy)
         # Init PlanManager by PlanPool and PlanMapper
         self.__planmanager = PlanManager(self.__plan_pool, self.__mapper)
+        # The resource_pool is fixed once the PlanGenerator is built, so its
+        # links and devices info are generated on first use and kept as
+        # tuples; callers get fresh copies they are free to modify
+        self.__links_info = None
+        self.__device_info = None
+
+    def register_plan(self, plan_type, plan_name, factory):
+        ''' Register a plan which is built by factory() on first use
+        Args:
+            plan_type: string, e.g. Allreduce
+            plan_name: string, e.g. ring
+            factory: callable returning a Plan with plan_type and plan_name
+        '''
+        self.__plan_pool.register_plan(plan_type, plan_name, factory)
 
     def get_execution_plan(self, plan_type, plan_name):
         ''' Generate the execution plan by plan_type and plan_name
@@ -59,11 +95,26 @@ class PlanGenerator():
 
         return execution_plan
 
+    def __get_device_hosts(self):
+        ''' Map each device of nodelist to the host of the GPU assigned to it
+            by the mapper, so plans see the same placement as mapping gives
+        '''
+        device_gpus = self.__mapper.map_devices(NodeList(self.__nodelist))
+        if device_gpus is None:
+            return {}
+        device_hosts = {}
+        for device, gpu in device_gpus.items():
+            device_hosts[device], _, _, _ = \
+                gpu.get_computation_hardware_description(gpu.get_name())
+        return device_hosts
+
     def get_links_info(self):
         # Generate Link info
-        links_info = self.__resource_pool.get_links_as_list()
+        if self.__links_info is None:
+            self.__links_info = tuple(
+                self.__resource_pool.get_links_as_list())
 
-        return links_info
+        return [dict(link) for link in self.__links_info]
 
     def get_routing_info(self):
         # Generate all routing info
@@ -76,6 +127,8 @@ class PlanGenerator():
 
     def get_device_info(self):
         # Generate devices info
-        device_info = self.__resource_pool.get_computational_hardware_as_list()
+        if self.__device_info is None:
+            self.__device_info = tuple(
+                self.__resource_pool.get_computational_hardware_as_list())
 
-        return device_info
+        return [dict(device) for device in self.__device_info]
@@ -50,6 +50,10 @@ class GPURoundRobinMapper(PlanMapper):
         super().__init__(resource_pool)
         self.__gpus = self.resource_pool.get_resource_list_from_type("GPU")
 
+    @property
+    def gpus(self):
+        return self.__gpus
+
     def map(self, node_list):
         if not isinstance(node_list, NodeList):
             return None
@@ -61,9 +65,9 @@ class GPURoundRobinMapper(PlanMapper):
             else:
                 return mapped_node_list
 
-    def __assign_device(self, node_list):
-        ''' This function assigns the virtual devices of node_list
-            as the real devices of resource_pool
+    def map_devices(self, node_list):
+        ''' Return a dict mapping each virtual device of node_list to the
+            GPU it is assigned to, or None if GPUs are not enough
         '''
         # Record all devices of node_list
         devices = []
@@ -72,11 +76,18 @@ class GPURoundRobinMapper(PlanMapper):
             if node.device is not None and node.device not in devices:
                 devices.append(node.device)
 
+        return self._map_devices(devices, node_list)
+
+    def __assign_device(self, node_list):
+        ''' This function assigns the virtual devices of node_list
+            as the real devices of resource_pool
+        '''
         # Check whether the node_list can be assigned into resource_pool
         if len(self.__gpus) < 1:
             # Resource Pool is empty
             return False
-        if len(self.__gpus) < len(devices):
+        device_gpus = self.map_devices(node_list)
+        if device_gpus is None:
             # GPU count in resource_pool can't meet the requirement
             return False
         # Check all routes exists for all communication nodes
@@ -84,8 +95,8 @@ class GPURoundRobinMapper(PlanMapper):
             src_gpu = None
             dst_gpu = None
             if node.device is not None and node.target is not None:
-                src_gpu = self.__gpus[devices.index(node.device)]
-                dst_gpu = self.__gpus[devices.index(node.target)]
+                src_gpu = device_gpus[node.device]
+                dst_gpu = device_gpus[node.target]
                 route_path = self.resource_pool.get_route_info(
                     src_gpu.get_name(), dst_gpu.get_name())
                 # No route found between src_gpu and dst_gpu
@@ -98,11 +109,11 @@ class GPURoundRobinMapper(PlanMapper):
             dst_gpu = None
             # Assign device
             if node.device is not None:
-                src_gpu = self.__gpus[devices.index(node.device)]
+                src_gpu = device_gpus[node.device]
                 node.device = src_gpu.get_name()
             # Assign target
             if node.target is not None:
-                dst_gpu = self.__gpus[devices.index(node.target)]
+                dst_gpu = device_gpus[node.target]
                 node.target = dst_gpu.get_name()
             # Assign route
             if node.device is not None and node.target is not None:
@@ -117,3 +128,56 @@ class GPURoundRobinMapper(PlanMapper):
                                         route_path[0])
 
         return True
+
+    def _map_devices(self, devices, node_list):
+        ''' Return a dict mapping each virtual device to a GPU, the i-th
+            device takes the i-th GPU. Return None if GPUs are not enough
+        '''
+        if len(self.__gpus) < len(devices):
+            return None
+        return dict(zip(devices, self.__gpus))
+
+
+class LoadAwareGPURoundRobinMapper(GPURoundRobinMapper):
+    """ Assign the most loaded devices to the fastest GPUs, each device on
+        its own GPU. Devices given GPUs of the same performance take them in
+        RoundRobin order, so on a homogeneous resource_pool the mapping is
+        the same as GPURoundRobinMapper. The load of a device is the sum of
+        execution_time of its computation nodes, where a node without
+        execution_time counts as 1
+    """
+    # Communication nodes are rewritten by plans, ignoring them keeps the
+    # mapping of a plan the same as the one of the nodes it is built from
+    COMMUNICATION_OPS = ('Allreduce', 'Send', 'Recv')
+
+    def _map_devices(self, devices, node_list):
+        if len(self.gpus) < len(devices):
+            return None
+        device_loads = {device: 0.0 for device in devices}
+        for node in node_list:
+            if node.device in device_loads and \
+               node.op not in self.COMMUNICATION_OPS:
+                device_loads[node.device] += \
+                    node.execution_time if node.execution_time else 1
+        # The fastest GPUs, taken in RoundRobin order on equal performance
+        gpu_indexes = sorted(
+            range(len(self.gpus)),
+            key=lambda index: -self.gpus[index].get_performance())
+        gpu_indexes = gpu_indexes[:len(devices)]
+        # Pair devices by decreasing load with GPUs by decreasing performance
+        ranked_devices = sorted(devices,
+                                key=lambda device: -device_loads[device])
+        device_performance = {
+            device: self.gpus[index].get_performance()
+            for device, index in zip(ranked_devices, gpu_indexes)
+        }
+        free_gpu_indexes = sorted(gpu_indexes)
+        device_gpus = {}
+        for device in devices:
+            gpu_index = next(
+                index for index in free_gpu_indexes
+                if self.gpus[index].get_performance() ==
+                device_performance[device])
+            free_gpu_indexes.remove(gpu_index)
+            device_gpus[device] = self.gpus[gpu_index]
+        return device_gpus
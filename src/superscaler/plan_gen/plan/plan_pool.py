@@ -9,11 +9,14 @@ class PlanPool(object):
     '''
     def __init__(self):
         self.__plan_pool = {}
+        # factories of registered plans which are not built yet
+        self.__plan_factories = {}
 
     def reset(self):
         ''' Reset plan pool to a clean dict
         '''
         self.__plan_pool.clear()
+        self.__plan_factories.clear()
 
     def has_plan(*args):
         ''' Check whether a plan exists
@@ -34,24 +37,29 @@ class PlanPool(object):
         else:
             return False
 
-        if plan_type not in self.__plan_pool:
-            return False
-        elif plan_name not in self.__plan_pool[plan_type]:
-            return False
-        else:
+        if plan_name in self.__plan_pool.get(plan_type, {}):
             return True
+        elif plan_name in self.__plan_factories.get(plan_type, {}):
+            return True
+        else:
+            return False
 
     def get_plan(self, plan_type, plan_name):
         ''' Get a plan by the indexs of plan_type and plan_name
         '''
-        if self.has_plan(plan_type, plan_name):
-            return self.__plan_pool[plan_type][plan_name]
-        else:
+        if not self.has_plan(plan_type, plan_name):
             return None
+        if plan_name in self.__plan_factories.get(plan_type, {}):
+            # Build a registered plan on its first access
+            factory = self.__plan_factories[plan_type].pop(plan_name)
+            self.__plan_pool.setdefault(plan_type, {})[plan_name] = factory()
+        return self.__plan_pool[plan_type][plan_name]
 
     def get_plan_list(self, plan_type):
         ''' Get a list of plan with same plan_type
         '''
+        for plan_name in list(self.__plan_factories.get(plan_type, {})):
+            self.get_plan(plan_type, plan_name)
         if plan_type not in self.__plan_pool:
             return []
         else:
@@ -60,10 +68,13 @@ class PlanPool(object):
     def delete_plan(self, plan):
         ''' Delete a plan from the plan pool
         '''
-        if self.has_plan(plan):
-            plan_type, plan_name = plan.get_plan_info()
+        plan_type, plan_name = plan.get_plan_info()
+        if plan_name in self.__plan_pool.get(plan_type, {}):
             self.__plan_pool[plan_type].pop(plan_name)
             return True
+        elif plan_name in self.__plan_factories.get(plan_type, {}):
+            self.__plan_factories[plan_type].pop(plan_name)
+            return True
         else:
             return False
 
@@ -74,3 +85,17 @@ class PlanPool(object):
         if plan_type not in self.__plan_pool:
             self.__plan_pool[plan_type] = {}
         self.__plan_pool[plan_type][plan_name] = plan
+        self.__plan_factories.get(plan_type, {}).pop(plan_name, None)
+
+    def register_plan(self, plan_type, plan_name, factory):
+        ''' Register a plan by a factory, the plan is only built by
+            calling factory() when it is first got from the plan pool
+        Args:
+            plan_type: the type of plan
+            plan_name: the name of plan
+            factory: callable returning the plan
+        '''
+        if plan_type not in self.__plan_factories:
+            self.__plan_factories[plan_type] = {}
+        self.__plan_factories[plan_type][plan_name] = factory
+        self.__plan_pool.get(plan_type, {}).pop(plan_name, None)
@@ -6,8 +6,28 @@ from superscaler.plan_gen.plan.allreduce_plan import AllreducePlan
 
 class RingAllreducePlan(AllreducePlan):
 
-    def __init__(self, plan_name="Ring_Allreduce_Plan"):
+    # Element size in bytes of tensor_type, unknown types count as 4 bytes
+    tensor_type_bytes = {'DT_FLOAT': 4,
+                         'DT_DOUBLE': 8,
+                         'DT_INT32': 4,
+                         'DT_UINT8': 1,
+                         'DT_INT16': 2,
+                         'DT_INT8': 1,
+                         'DT_INT64': 8,
+                         'DT_BOOL': 1,
+                         'DT_HALF': 2}
+
+    def __init__(self, plan_name="Ring_Allreduce_Plan", segment_bytes=None):
+        ''' Init a ring plan
+        Args:
+            plan_name: string, e.g. ring
+            segment_bytes: int/None, split each chunk into segments of about
+                segment_bytes which are pipelined along the ring, so a hop
+                forwards a segment while later ones are still in flight.
+                None disables the segmentation
+        '''
         super().__init__(plan_name=plan_name)
+        self.__segment_bytes = segment_bytes
 
     def separate_allreduce_node(self, node, endpoint):
         '''
@@ -54,51 +74,185 @@ class RingAllreducePlan(AllreducePlan):
         sendIndex = myRank
         receiveIndex = (myRank + nRanks - 1) % nRanks
 
+        nSegments = self._get_segment_count(node, chunkSizes)
+        if nSegments > 1:
+            # Each segment has its own dependency chain so that segments are
+            # pipelined instead of serialized behind the whole chunk
+            input_names = [None] * nSegments
+            node_index, input_names, sendIndex, receiveIndex = \
+                self._generate_segmented_ring_steps(
+                    node=node,
+                    node_index=node_index,
+                    input_names=input_names,
+                    phase='scatter',
+                    reduction='sum',
+                    sendTarget=sendTarget,
+                    recvTarget=recvTarget,
+                    offsets=offsets,
+                    chunkSizes=chunkSizes,
+                    sendIndex=sendIndex,
+                    receiveIndex=receiveIndex,
+                    nSegments=nSegments)
+            self._generate_segmented_ring_steps(node=node,
+                                                node_index=node_index,
+                                                input_names=input_names,
+                                                phase='allgather',
+                                                reduction='copy',
+                                                sendTarget=sendTarget,
+                                                recvTarget=recvTarget,
+                                                offsets=offsets,
+                                                chunkSizes=chunkSizes,
+                                                sendIndex=sendIndex,
+                                                receiveIndex=receiveIndex,
+                                                nSegments=nSegments)
+            self._get_node_list().remove(node)
+            return
+
         # Scatter-reduce: each gpu sends gradients to the next gpu,
         # and receives gradients from the previous gpu in ring.
         # Finally each GPU will contain a part of reduced gradients
+        node_index, input_name, sendIndex, receiveIndex = \
+            self._generate_ring_steps(node=node,
+                                      node_index=node_index,
+                                      input_name=input_name,
+                                      phase='scatter',
+                                      reduction='sum',
+                                      sendTarget=sendTarget,
+                                      recvTarget=recvTarget,
+                                      offsets=offsets,
+                                      chunkSizes=chunkSizes,
+                                      sendIndex=sendIndex,
+                                      receiveIndex=receiveIndex)
+
+        # Allgather: GPUs will gather gradients from ring.
+        # Finally all GPUs will get reduced gradients
+        self._generate_ring_steps(node=node,
+                                  node_index=node_index,
+                                  input_name=input_name,
+                                  phase='allgather',
+                                  reduction='copy',
+                                  sendTarget=sendTarget,
+                                  recvTarget=recvTarget,
+                                  offsets=offsets,
+                                  chunkSizes=chunkSizes,
+                                  sendIndex=sendIndex,
+                                  receiveIndex=receiveIndex)
+        self._get_node_list().remove(node)
+
+    def _get_segment_count(self, node, chunkSizes):
+        '''
+        Return how many segments each chunk is split into, 1 means no split.
+        All chunks share the count so that both ends of a step agree on it
+
+        Args:
+            node: dict, the node with allreduce op
+            chunkSizes: list, the data size of each chunk
+        '''
+        if not self.__segment_bytes:
+            return 1
+        elementBytes = self.tensor_type_bytes.get(node.tensor_type, 4)
+        chunkBytes = max(chunkSizes) * elementBytes
+        nSegments = -(-chunkBytes // self.__segment_bytes)
+        # Never produce empty segments
+        return max(1, min(nSegments, min(chunkSizes)))
+
+    def _generate_segmented_ring_steps(self, node, node_index, input_names,
+                                       phase, reduction, sendTarget,
+                                       recvTarget, offsets, chunkSizes,
+                                       sendIndex, receiveIndex, nSegments):
+        '''
+        Generate the len(chunkSizes) - 1 steps of one ring phase where each
+        chunk is split into nSegments segments. A segment only depends on the
+        same segment of the previous step
+
+        Args:
+            input_names: list, the input dependency of the first node of
+                each segment
+            nSegments: int, the count of segments in each chunk
+            others are the same as _generate_ring_steps
+        Returns:
+            (node_index, input_names, sendIndex, receiveIndex) for the
+            following phase
+        '''
+        def split_chunk(index):
+            sizes = [chunkSizes[index] // nSegments +
+                     (i < chunkSizes[index] % nSegments)
+                     for i in range(nSegments)]
+            return [offsets[index] + sum(sizes[:i])
+                    for i in range(nSegments)], sizes
+
+        input_names = list(input_names)
+        nRanks = len(chunkSizes)
         for index in range(nRanks - 1):
-            # Generate send node for scatter-reduce
+            sendOffsets, sendSizes = split_chunk(sendIndex)
+            recvOffsets, recvSizes = split_chunk(receiveIndex)
+            for segment in range(nSegments):
+                suffix = str(index) + '_' + str(segment)
+                # Generate send node
+                node_name = node.name + '_' + phase + '_send_' + suffix
+                target_name = node.name + '_' + phase + '_recv_' + suffix
+                self._generate_node(node_index=node_index,
+                                    node_name=node_name,
+                                    input_name=input_names[segment],
+                                    target_name=target_name,
+                                    op='Send',
+                                    reduction='',
+                                    offset=sendOffsets[segment],
+                                    size=sendSizes[segment],
+                                    target=sendTarget,
+                                    node_info=node)
+                input_names[segment] = node_name
+                node_index += 1
 
-            node_name = node.name + '_scatter_send_' + str(index)
-            target_name = node.name + '_scatter_recv_' + str(index)
-            self._generate_node(node_index=node_index,
-                                node_name=node_name,
-                                input_name=input_name,
-                                target_name=target_name,
-                                op='Send',
-                                reduction='',
-                                offset=offsets[sendIndex],
-                                size=chunkSizes[sendIndex],
-                                target=sendTarget,
-                                node_info=node)
-            input_name = node_name
-            node_index += 1
+                # Generate recv node
+                node_name = node.name + '_' + phase + '_recv_' + suffix
+                target_name = node.name + '_' + phase + '_send_' + suffix
+                self._generate_node(node_index=node_index,
+                                    node_name=node_name,
+                                    input_name=input_names[segment],
+                                    target_name=target_name,
+                                    op='Recv',
+                                    reduction=reduction,
+                                    offset=recvOffsets[segment],
+                                    size=recvSizes[segment],
+                                    target=recvTarget,
+                                    node_info=node)
+                input_names[segment] = node_name
+                node_index += 1
             sendIndex = (sendIndex + nRanks - 1) % nRanks
-
-            # Generate recv node for scatter-reduce
-            node_name = node.name + '_scatter_recv_' + str(index)
-            target_name = node.name + '_scatter_send_' + str(index)
-            self._generate_node(node_index=node_index,
-                                node_name=node_name,
-                                input_name=input_name,
-                                target_name=target_name,
-                                op='Recv',
-                                reduction='sum',
-                                offset=offsets[receiveIndex],
-                                size=chunkSizes[receiveIndex],
-                                target=recvTarget,
-                                node_info=node)
-            input_name = node_name
-            node_index += 1
             receiveIndex = (receiveIndex + nRanks - 1) % nRanks
 
-        # Allgather: GPUs will gather gradients from ring.
-        # Finally all GPUs will get reduced gradients
+        return node_index, input_names, sendIndex, receiveIndex
+
+    def _generate_ring_steps(self, node, node_index, input_name, phase,
+                             reduction, sendTarget, recvTarget, offsets,
+                             chunkSizes, sendIndex, receiveIndex):
+        '''
+        Generate the len(chunkSizes) - 1 steps of one ring phase, each step
+        sends a chunk to sendTarget and receives a chunk from recvTarget,
+        then both indexes move back by one chunk
+
+        Args:
+            node: dict, the node with allreduce op
+            node_index: int, the index where generated nodes are inserted
+            input_name: str/None, the input dependency of the first node
+            phase: str, the name of the phase used in node names
+            reduction: str, the reduction of recv nodes
+            sendTarget: str, the device of the next rank
+            recvTarget: str, the device of the previous rank
+            offsets: list, the data address of each chunk
+            chunkSizes: list, the data size of each chunk
+            sendIndex: int, the chunk sent at the first step
+            receiveIndex: int, the chunk received at the first step
+        Returns:
+            (node_index, input_name, sendIndex, receiveIndex) for the
+            following phase
+        '''
+        nRanks = len(chunkSizes)
         for index in range(nRanks - 1):
-            # Generate send node for allgather
-            node_name = node.name + '_allgather_send_' + str(index)
-            target_name = node.name + '_allgather_recv_' + str(index)
+            # Generate send node
+            node_name = node.name + '_' + phase + '_send_' + str(index)
+            target_name = node.name + '_' + phase + '_recv_' + str(index)
             self._generate_node(node_index=node_index,
                                 node_name=node_name,
                                 input_name=input_name,
@@ -113,15 +267,15 @@ class RingAllreducePlan(AllreducePlan):
             node_index += 1
             sendIndex = (sendIndex + nRanks - 1) % nRanks
 
-            # Generate recv node for allgather
-            node_name = node.name + '_allgather_recv_' + str(index)
-            target_name = node.name + '_allgather_send_' + str(index)
+            # Generate recv node
+            node_name = node.name + '_' + phase + '_recv_' + str(index)
+            target_name = node.name + '_' + phase + '_send_' + str(index)
             self._generate_node(node_index=node_index,
                                 node_name=node_name,
                                 input_name=input_name,
                                 target_name=target_name,
                                 op='Recv',
-                                reduction='copy',
+                                reduction=reduction,
                                 offset=offsets[receiveIndex],
                                 size=chunkSizes[receiveIndex],
                                 target=recvTarget,
@@ -129,4 +283,5 @@ class RingAllreducePlan(AllreducePlan):
             input_name = node_name
             node_index += 1
             receiveIndex = (receiveIndex + nRanks - 1) % nRanks
-        self._get_node_list().remove(node)
+
+        return node_index, input_name, sendIndex, receiveIndex
@@ -25,14 +25,14 @@ parser.add_argument('--print_fetches_targets', type=bool, default=False,
 def main():
     args = parser.parse_args()
     # prepare resource
-    pbtxt_path = os.path.join(args.model_dir_prefix, 'graph.pbtxt')
+    graph_path = os.path.join(args.model_dir_prefix, 'graph.pb')
     desc_path = os.path.join(args.model_dir_prefix, 'model_desc.json')
     plan_path = os.path.join(args.model_dir_prefix, 'plan.json')
     lib_path = os.path.abspath(os.path.join(os.environ["SUPERSCLAR_PATH"],
                                             "lib/libsuperscaler_pywrap.so"))
 
     # Superscaler: initialize runtime library.
-    sc = rt.TFRuntime(pbtxt_path, desc_path, plan_path, lib_path)
+    sc = rt.TFRuntime(graph_path, desc_path, plan_path, lib_path)
 
     # Superscaler: pin tensorflow configure
     config = tf.ConfigProto()
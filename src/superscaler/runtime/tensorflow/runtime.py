@@ -36,10 +36,15 @@ class TFRuntime(Runtime):
           device_id: string specifying the running devices
         """
 
-        # open tf_graph
-        with open(graph_file) as f:
-            graph_txt = f.read()
-        graph_def = text_format.Parse(graph_txt, tf.compat.v1.GraphDef())
+        # open tf_graph, .pb files hold the serialized graph
+        if graph_file.endswith('.pb'):
+            graph_def = tf.compat.v1.GraphDef()
+            with open(graph_file, 'rb') as f:
+                graph_def.ParseFromString(f.read())
+        else:
+            with open(graph_file) as f:
+                graph_txt = f.read()
+            graph_def = text_format.Parse(graph_txt, tf.compat.v1.GraphDef())
         graph_clone = tf.Graph()
 
         # extract key tensors and operatos from tf_graph by graph_desc
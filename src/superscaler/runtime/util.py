@@ -3,12 +3,86 @@
 # Licensed under the MIT License.
 
 import os
+import shlex
 import subprocess
-from collections import defaultdict
+import sys
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
-def run_shell_cmd(cmd):
-    subprocess.check_output(cmd, shell=True)
+def _forward_lines(stream, out, binary):
+    """
+    copy the lines of the byte stream to out, decoded unless out is binary.\
+        The stream is drained to its end even if writing to out fails, so\
+        the child never blocks on a full pipe
+    """
+    for line in iter(stream.readline, b''):
+        if out is None:
+            continue
+        try:
+            out.write(line if binary else line.decode(errors='replace'))
+            out.flush()
+        except Exception:
+            # stop forwarding, but keep reading the pipe
+            out = None
+    stream.close()
+
+
+def stream_shell_cmd(cmd, env=None):
+    """
+    run cmd without spawning a shell, its stdout and stderr are merged and\
+        forwarded to sys.stdout line by line while it runs, so a long\
+        job never holds more than one line of its log in memory
+    @cmd: an argv list, or a string split in the shell-like syntax
+    @env: the environment of cmd, None inherits the current one
+    """
+    if isinstance(cmd, str):
+        cmd = shlex.split(cmd)
+    proc = subprocess.Popen(cmd,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            env=env)
+    # sys.stdout may be text only, e.g. a StringIO or a notebook stream
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is not None:
+        args = (proc.stdout, buffer, True)
+    else:
+        args = (proc.stdout, sys.stdout, False)
+    reader = threading.Thread(target=_forward_lines, args=args, daemon=True)
+    reader.start()
+    returncode = proc.wait()
+    reader.join()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def _rsync_one(ip, local_resource_dir, remote_resource_dir):
+    """
+    sync local_resource_dir to remote_resource_dir on a single host,\
+        returns (ip, returncode) and raises CalledProcessError carrying\
+        rsync's stderr on failure
+    """
+    if ip == "localhost":
+        dst = remote_resource_dir
+    else:
+        # Remote sync runtime files
+        dst = '%s:%s' % (ip, remote_resource_dir)
+    # whole-file transfer with light compression: the per-rank resource dirs
+    # are many small files pushed once, so rsync's delta pass buys nothing
+    cmd = ['rsync', '-a', '--compress-level=1', '-W', '--inplace',
+           local_resource_dir, dst]
+    result = subprocess.run(cmd,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        stderr = result.stderr.decode(errors='replace')
+        sys.stderr.write(stderr)
+        raise subprocess.CalledProcessError(result.returncode, cmd,
+                                            output=result.stdout,
+                                            stderr=stderr)
+    return ip, result.returncode
 
 
 def distribute_resources(deployment_setting,
@@ -32,19 +106,86 @@ def distribute_resources(deployment_setting,
         raise Exception('local_resource_dir: %s is not existed!' %
                         (local_resource_dir))
 
-    for ip in deployment_setting.keys():
-        if ip == "localhost":
-            run_shell_cmd('rsync -az %s %s' %
-                          (local_resource_dir, remote_resource_dir))
-        else:
-            # Remote sync runtime files
-            run_shell_cmd('rsync -az %s %s:%s' %
-                          (local_resource_dir, ip, remote_resource_dir))
+    # every host is synced independently, so fan the transfers out
+    # concurrently and raise on the first failed one, dropping the
+    # transfers which have not started yet
+    if deployment_setting:
+        max_workers = min(32, len(deployment_setting))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_rsync_one, ip, local_resource_dir,
+                                remote_resource_dir)
+                for ip in deployment_setting.keys()
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
 
+    # os.path.basename keeps rsync's trailing-slash semantic: syncing 'dir/'
+    # delivers the content of dir into remote_resource_dir itself
     return os.path.join(remote_resource_dir,
                         os.path.basename(local_resource_dir))
 
 
+def _slurm_hostnames():
+    """
+    returns the set of node names of the current Slurm allocation,\
+        empty outside an allocation or when scontrol is unavailable
+    """
+    nodelist = os.environ.get('SLURM_JOB_NODELIST')
+    if 'SLURM_JOB_ID' not in os.environ or not nodelist:
+        return set()
+    try:
+        result = subprocess.run(['scontrol', 'show', 'hostnames', nodelist],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True)
+    except OSError:
+        return set()
+    if result.returncode != 0:
+        return set()
+    return set(result.stdout.split())
+
+
+def _mpi_launcher(rank2ip):
+    """
+    returns 'srun' inside a Slurm allocation when every rank is placed on\
+        a node of the allocation, where ranks are started directly by the\
+        resource manager through PMIx without the orted tree of mpirun,\
+        otherwise returns 'mpirun'. srun only accepts allocation node\
+        names, so deployments addressed by ip or localhost keep mpirun
+    """
+    hostnames = _slurm_hostnames()
+    if hostnames and set(rank2ip) <= hostnames:
+        return 'srun'
+    return 'mpirun'
+
+
+def _srun_launch(rank2ip, rank2cmd):
+    """
+    launch one task per rank with srun, rank i runs rank2cmd[i]\
+        on rank2ip[i] through a --multi-prog configuration
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.conf') as multi_prog, \
+            tempfile.NamedTemporaryFile('w', suffix='.hosts') as host_file:
+        for rank, cmd in enumerate(rank2cmd):
+            multi_prog.write('%d %s\n' % (rank, cmd))
+        multi_prog.flush()
+        # arbitrary distribution places task i on line i of SLURM_HOSTFILE
+        host_file.write('\n'.join(rank2ip) + '\n')
+        host_file.flush()
+
+        env = dict(os.environ, SLURM_HOSTFILE=host_file.name)
+        stream_shell_cmd(['srun', '--mpi=pmix',
+                          '--ntasks', str(len(rank2ip)),
+                          '--distribution', 'arbitrary',
+                          '--multi-prog', multi_prog.name], env=env)
+
+
 def launch(rank2ip, rank2cmd):
     """
     this helper function helps to launch cmds in a MPMD manner,\
@@ -54,19 +195,37 @@ def launch(rank2ip, rank2cmd):
         which means rank 0 will be assigned to the corresponding ip
     @rank2cmd:  a list of per process to-be-executed cmd
     """
+    if _mpi_launcher(rank2ip) == 'srun':
+        _srun_launch(rank2ip, rank2cmd)
+        return
+
     def parse_host_args(rank2ip):
-        hosts_and_slots = defaultdict(int)
-        for x in rank2ip:
-            hosts_and_slots[x] += 1
-        return hosts_and_slots
+        # Counter tallies in C; OrderedDict keeps hosts in first-rank order
+        return OrderedDict(Counter(rank2ip))
 
     hosts_and_slots = parse_host_args(rank2ip)
+    # every rank on a host shares the same 'ip:slots' token
+    slot_str = OrderedDict(
+        (ip, f'{ip}:{slots}') for ip, slots in hosts_and_slots.items())
+
+    # mpirun fills the -H host list slot by slot, so a single app context
+    # only reproduces rank2ip when the ranks of each host are contiguous
+    host_contiguous = list(rank2ip) == [
+        ip for ip, slots in hosts_and_slots.items() for _ in range(slots)
+    ]
 
-    mpirun_command = (
-        'mpirun --allow-run-as-root --tag-output '
-        '{cmds} '.format(
-            cmds=' : '.join('-np 1 -host {ip_slots} {cmd}'.format(
-                ip_slots=ip + ':' + str(hosts_and_slots[ip]), cmd=(cmd))
-                for ip, cmd in zip(rank2ip, rank2cmd))))
+    mpirun_command = ['mpirun', '--allow-run-as-root', '--tag-output']
+    if len(set(rank2cmd)) == 1 and host_contiguous:
+        mpirun_command += ['-H', ','.join(slot_str.values()),
+                           '-np', str(len(rank2ip))]
+        mpirun_command += shlex.split(rank2cmd[0])
+    else:
+        # ranks often share a handful of distinct cmds, tokenize each once
+        argv = {cmd: shlex.split(cmd) for cmd in set(rank2cmd)}
+        for rank, (ip, cmd) in enumerate(zip(rank2ip, rank2cmd)):
+            if rank > 0:
+                mpirun_command.append(':')
+            mpirun_command += ['-np', '1', '-host', slot_str[ip]]
+            mpirun_command += argv[cmd]
 
-    run_shell_cmd(mpirun_command)
+    stream_shell_cmd(mpirun_command)
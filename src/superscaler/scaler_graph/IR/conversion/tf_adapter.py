@@ -1,9 +1,12 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import functools
 import google.protobuf.text_format
+import mmap
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
 from tensorflow.python import types_pb2, tensor_shape
 from tensorflow.core.framework import tensor_pb2
@@ -28,11 +31,32 @@ from superscaler.scaler_graph.IR.conversion.tensorflow_ops \
 from superscaler.scaler_graph.IR.util import graph_util
 from superscaler.scaler_graph.util.log import logger
 __all__ = [
-    "import_graph_from_tf_pbtxts", "get_tf_runtime_config",
-    "export_graph_to_tf_file", "import_tensorflow_model", "set_dataset_paths"
+    "import_graph_from_tf_pbtxts", "import_graph_from_tf_pb",
+    "get_tf_runtime_config", "export_graph_to_tf_file",
+    "import_tensorflow_model", "set_dataset_paths", "set_dataset_paths_binary"
 ]
 
 
+def __parse_tf_input(input):
+    '''return (node name, output index) of a tf input string,
+    the index of a control edge is -1.
+    '''
+    if input[0] == "^":
+        return input[1:], -1
+    name, sep, index = input.partition(":")
+    return name, (int(index) if sep else 0)
+
+
+# ops placed on CPU without asking the kernel registry: the iterator ops
+# are kept on CPU on purpose, the checkpoint ops only have CPU kernels
+_NEVER_GPU_OPS = frozenset([
+    "MakeIterator", "IteratorV2", "IteratorGetNext", "SaveV2", "RestoreV2",
+    "MergeV2Checkpoints"
+])
+# ops left to the default placement without asking the kernel registry
+_ANY_DEVICE_OPS = frozenset(["NoOp"])
+
+
 def __set_device_info(graph_def):
     '''
     1. return CPU device info if no GPU kernel
@@ -41,28 +65,63 @@ def __set_device_info(graph_def):
        , we save this for a second pass, so that the consumer's
        placement is chosen.
     '''
+    def load_kernels(op_type):
+        '''return (registered kernels, names of the type attrs they
+        constrain) of op_type.
+        '''
+        kernel_list = kernels.get_registered_kernels_for_op(op_type)
+        if len(kernel_list.kernel) < 1:
+            logger().error("no kernel for operator: %s" % (op_type))
+            raise RuntimeError
+        constraint_names = tuple(
+            sorted({
+                constraint.name
+                for kernel in kernel_list.kernel
+                for constraint in kernel.constraint
+                if constraint.HasField("allowed_values")
+            }))
+        return kernel_list.kernel, constraint_names
+
+    # the registry is queried once per op type, concurrently, before the
+    # serial pass over nodes, which then only reads op_kernels
+    op_types = list({tf_node.op
+                     for tf_node in graph_def.node} - _NEVER_GPU_OPS -
+                    _ANY_DEVICE_OPS)
+    op_kernels = {}
+    if op_types:
+        with ThreadPoolExecutor(
+                max_workers=min(32, len(op_types))) as executor:
+            op_kernels.update(
+                zip(op_types, executor.map(load_kernels, op_types)))
+    # (op, types of the constrained attrs) -> whether a GPU kernel fits
+    support_GPU_cache = {}
+
     def support_GPU(tf_node):
-        special_ops = ["MakeIterator", "IteratorV2", "IteratorGetNext"]
-        if tf_node.op in special_ops:
+        if tf_node.op in _NEVER_GPU_OPS:
             return False
-        ignore_ops = ["NoOp"]
-        if tf_node.op in ignore_ops:
+        if tf_node.op in _ANY_DEVICE_OPS:
             return True
+        kernel_list, constraint_names = op_kernels[tf_node.op]
+        # read attrs without indexing the map, which would insert defaults
+        attr_types = tuple(tf_node.attr[name].type if name in tf_node.attr
+                           else types_pb2.DT_INVALID
+                           for name in constraint_names)
+        key = (tf_node.op, attr_types)
+        if key in support_GPU_cache:
+            return support_GPU_cache[key]
+        type_of = dict(zip(constraint_names, attr_types))
         support_GPU = False
-        kernel_list = kernels.get_registered_kernels_for_op(tf_node.op)
-        if len(kernel_list.kernel) < 1:
-            logger().error("no kernel for operator: %s" % (tf_node.op))
-            raise RuntimeError
-        for kernel in kernel_list.kernel:
+        for kernel in kernel_list:
             is_suitable = True
             for constraint in kernel.constraint:
                 if constraint.HasField("allowed_values"):
                     allowed_list = constraint.allowed_values.list.type
-                    if tf_node.attr[constraint.name].type not in allowed_list:
+                    if type_of[constraint.name] not in allowed_list:
                         is_suitable = False
                         break
             if is_suitable and kernel.device_type == "GPU":
                 support_GPU = True
+        support_GPU_cache[key] = support_GPU
         return support_GPU
 
     no_input_nodes = []
@@ -77,45 +136,58 @@ def __set_device_info(graph_def):
     # Heuristic A
     for tf_node in graph_def.node:
         for input in tf_node.input:
-            if input.startswith("^"):
-                name = input[1:]
-            else:
-                name = input.split(":")[0]
+            name, _ = __parse_tf_input(input)
             if name_to_node[name] in no_input_nodes:
                 name_to_node[name].device = tf_node.device
 
 
-def __get_dtype_proto(node_def, op_def, output_arg):
+def __get_dtype_proto(node_def, attr_defs, output_arg):
     def with_number_attr(dtype):
         if len(output_arg.number_attr) != 0:
-            for attr in op_def.attr:
-                if attr.name == output_arg.number_attr:
-                    return [dtype] * node_def.attr[attr.name].i
-            raise AssertionError
+            if output_arg.number_attr not in attr_defs:
+                raise AssertionError
+            return [dtype] * node_def.attr[output_arg.number_attr].i
         else:
             return dtype
 
     if len(output_arg.type_attr) != 0:
-        for attr in op_def.attr:
-            if attr.name == output_arg.type_attr:
-                return with_number_attr(node_def.attr[attr.name].type)
-        raise AssertionError
+        if output_arg.type_attr not in attr_defs:
+            raise AssertionError
+        return with_number_attr(node_def.attr[output_arg.type_attr].type)
     elif len(output_arg.type_list_attr) != 0:
-        for attr in op_def.attr:
-            if attr.name == output_arg.type_list_attr:
-                return list(node_def.attr[attr.name].list.type)
-        raise AssertionError
+        if output_arg.type_list_attr not in attr_defs:
+            raise AssertionError
+        return list(node_def.attr[output_arg.type_list_attr].list.type)
     else:
         assert output_arg.type != types_pb2.DT_INVALID
         return with_number_attr(output_arg.type)
 
 
-def __get_dtypes(tf_graph, node_def):
+def __op_def_getter(tf_graph):
+    '''return a function resolving (op def, {attr name: attr def}) of
+    tf_graph, each op type is looked up in the tf op registry only once.
+    '''
+    op_defs = {}
+
+    def get_op_def(op_type):
+        entry = op_defs.get(op_type)
+        if entry is None:
+            op_def = tf_graph._get_op_def(op_type)
+            entry = op_defs[op_type] = (op_def, {
+                attr_def.name: attr_def
+                for attr_def in op_def.attr
+            })
+        return entry
+
+    return get_op_def
+
+
+def __get_dtypes(get_op_def, node_def):
     '''parse tf dtypes.
     '''
-    op_def = tf_graph._get_op_def(node_def.op)
+    op_def, attr_defs = get_op_def(node_def.op)
     dtypes = [
-        __get_dtype_proto(node_def, op_def, output_arg)
+        __get_dtype_proto(node_def, attr_defs, output_arg)
         for output_arg in op_def.output_arg
     ]
     if len(dtypes) == 1 and isinstance(dtypes[0], list):
@@ -123,170 +195,239 @@ def __get_dtypes(tf_graph, node_def):
     return [tf.as_dtype(dtype) for dtype in dtypes]
 
 
+# tf.as_dtype on the enum value of a type attr, called per attr of per node
+_as_dtype = functools.lru_cache(maxsize=None)(tf.as_dtype)
+
+# names of the dtype attrs of common tf ops, which are read without
+# WhichOneof; a list(type) attr with one of these names has no type value
+# and still goes through __from_attr_proto
+_TYPE_ATTRS = frozenset([
+    "T", "dtype", "DstT", "SrcT", "Tidx", "Tshape", "Tindices", "Tparams",
+    "Tpaddings", "Tmultiples", "Tperm", "TI", "Tlabels", "Index",
+    "out_type", "output_type"
+])
+
+# field of AttrValue.value -> parser of the AttrValue
+_ATTR_VALUE = {
+    "s": attrgetter("s"),
+    "i": attrgetter("i"),
+    "f": attrgetter("f"),
+    "b": attrgetter("b"),
+    "type": lambda attr_value: _as_dtype(attr_value.type),
+    "shape": lambda attr_value: tensor_shape.as_shape(attr_value.shape),
+    "tensor": attrgetter("tensor"),
+    "func": attrgetter("func"),
+    "placeholder": attrgetter("placeholder"),
+}
+
+# (field, parser) of AttrValue.ListValue, the first non-empty field is used
+_ATTR_LIST_VALUE = (
+    ("s", list),
+    ("i", list),
+    ("f", list),
+    ("b", list),
+    ("type", lambda values: [_as_dtype(value) for value in values]),
+    ("shape",
+     lambda values: [tensor_shape.as_shape(value) for value in values]),
+    ("tensor", list),
+    ("func", list),
+)
+
+
 def __from_attr_proto(attr_value):
     '''parse tf node attributions.
     '''
     field_name = attr_value.WhichOneof("value")
-    if field_name == "s":
-        return attr_value.s
-    elif field_name == "i":
-        return attr_value.i
-    elif field_name == "f":
-        return attr_value.f
-    elif field_name == "b":
-        return attr_value.b
-    elif field_name == "type":
-        return tf.as_dtype(attr_value.type)
-    elif field_name == "shape":
-        return tensor_shape.as_shape(attr_value.shape)
-    elif field_name == "tensor":
-        return attr_value.tensor
-    elif field_name == "func":
-        return attr_value.func
-    elif field_name == "placeholder":
-        return attr_value.placeholder
-    elif field_name == "list":
+    if field_name == "list":
         list_value = attr_value.list
-        if len(list_value.s) != 0:
-            return [value for value in list_value.s]
-        elif len(list_value.i) != 0:
-            return [value for value in list_value.i]
-        elif len(list_value.f) != 0:
-            return [value for value in list_value.f]
-        elif len(list_value.b) != 0:
-            return [value for value in list_value.b]
-        elif len(list_value.type) != 0:
-            return [tf.as_dtype(value) for value in list_value.type]
-        elif len(list_value.shape) != 0:
-            return [tensor_shape.as_shape(value) for value in list_value.shape]
-        elif len(list_value.tensor) != 0:
-            return [value for value in list_value.tensor]
-        elif len(list_value.func) != 0:
-            return [value for value in list_value.func]
-        else:
-            return []
-
-
-def import_graph_from_tf_pbtxts(file_paths, tf_runtime_config):
+        for list_field_name, parse in _ATTR_LIST_VALUE:
+            values = getattr(list_value, list_field_name)
+            if len(values) != 0:
+                return parse(values)
+        return []
+    parse = _ATTR_VALUE.get(field_name)
+    if parse is not None:
+        return parse(attr_value)
+
+
+def __merge_tf_pb(file_path, graph_def):
+    '''merge a serialized GraphDef file into graph_def through mmap,
+    without reading the file into a bytes object first.
+    '''
+    with open(file_path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped, and merges nothing
+            return
+        with buffer:
+            try:
+                graph_def.MergeFromString(buffer)
+            except TypeError:
+                # some protobuf backends only accept bytes
+                graph_def.MergeFromString(buffer[:])
+
+
+def __read_tf_pbtxt(file_path, cache_binary):
+    '''parse a tf pbtxt into a GraphDef.
+    With cache_binary, a binary sidecar file_path + ".pb" is written after
+    the text parse and is preferred while it is newer than the pbtxt.
+    '''
+    graph_def = tf.GraphDef()
+    text_file = Path(file_path)
+    binary_file = Path(str(file_path) + ".pb")
+    if cache_binary and binary_file.exists() and \
+            binary_file.stat().st_mtime >= text_file.stat().st_mtime:
+        __merge_tf_pb(binary_file, graph_def)
+        return graph_def
+    # bytes are decoded as utf-8 by protobuf, whatever the locale is
+    google.protobuf.text_format.Parse(text_file.read_bytes(), graph_def)
+    if cache_binary:
+        try:
+            binary_file.write_bytes(graph_def.SerializeToString())
+        except OSError:
+            logger().warning("cannot cache %s, keep using the pbtxt" %
+                             (binary_file))
+    return graph_def
+
+
+def import_graph_from_tf_pbtxts(file_paths,
+                                tf_runtime_config,
+                                cache_binary=False):
     '''convert tf pbtxts to sc graph.
     1. merge tf pbtxts into tf_graph_def;
     2. convert tf_graph_def to sc graph
+    Args:
+        cache_binary: reuse a binary ".pb" sidecar of each pbtxt, which
+            parses much faster than the text format on later imports
+    Return:
+        SC graph
+    '''
+    tf_graph_def = tf.GraphDef()
+    assert (len(file_paths) > 0)
+    for file_path in file_paths:
+        tf_graph_def.MergeFrom(__read_tf_pbtxt(file_path, cache_binary))
+    sc_graph = __import_graph_from_tf_graph_def(tf_graph_def,
+                                                tf_runtime_config)
+    return sc_graph
+
+
+def import_graph_from_tf_pb(file_paths, tf_runtime_config):
+    '''convert binary tf GraphDefs to sc graph.
+    1. merge serialized tf GraphDefs into tf_graph_def;
+    2. convert tf_graph_def to sc graph
     Return:
         SC graph
     '''
     tf_graph_def = tf.GraphDef()
     assert (len(file_paths) > 0)
-    google.protobuf.text_format.Parse(
-        Path(file_paths[0]).read_text(), tf_graph_def)
-    for file_path in file_paths[1:]:
-        google.protobuf.text_format.Merge(
-            Path(file_path).read_text(), tf_graph_def)
+    for file_path in file_paths:
+        __merge_tf_pb(file_path, tf_graph_def)
     sc_graph = __import_graph_from_tf_graph_def(tf_graph_def,
                                                 tf_runtime_config)
     return sc_graph
 
 
 def __import_graph_from_tf_graph_def(tf_graph_def, tf_runtime_config):
-    def mark_runtime_info(sc_node, tf_runtime_config):
-        if "sc_metadata" not in sc_node.attrs:
-            sc_node.attrs["sc_metadata"] = {}
-        if "runtime_config" not in sc_node.attrs["sc_metadata"]:
-            sc_node.attrs["sc_metadata"]["runtime_config"] = {}
-        node_runtime_config = sc_node.attrs["sc_metadata"]["runtime_config"]
-        if sc_node.name in tf_runtime_config["inits"]:
-            node_runtime_config["init"] = True
-            tf_runtime_config["inits"].remove(sc_node.name)
-        else:
-            node_runtime_config["init"] = False
-        if sc_node.name in tf_runtime_config["feeds"]:
-            node_runtime_config["feed"] = True
-            tf_runtime_config["feeds"].remove(sc_node.name)
-        else:
-            node_runtime_config["feed"] = False
-        node_runtime_config["fetch"] = []
-        for curr in tf_runtime_config["fetches"]:
-            if sc_node.name == curr.split(":")[0]:
-                if len(curr.split(":")) == 1:
-                    node_runtime_config["fetch"].append(-1)
-                else:
-                    node_runtime_config["fetch"].append(int(
-                        curr.split(":")[1]))
-                tf_runtime_config["fetches"].remove(curr)
-        if sc_node.name in tf_runtime_config["targets"]:
-            node_runtime_config["target"] = True
-            tf_runtime_config["targets"].remove(sc_node.name)
-        else:
-            node_runtime_config["target"] = False
+    # sets and a name-keyed dict of fetched indexes, so that marking a node
+    # costs O(1) instead of scanning the lists of tf_runtime_config
+    remaining_config = {
+        key: set(tf_runtime_config[key])
+        for key in ["inits", "feeds", "targets"]
+    }
+    fetches_by_name = {}
+    for fetch in tf_runtime_config["fetches"]:
+        name, sep, index = fetch.partition(":")
+        fetches_by_name.setdefault(name, []).append(
+            int(index) if sep else -1)
+
+    def mark_runtime_info(sc_node, remaining_config):
+        node_runtime_config = sc_node.attrs.setdefault(
+            "sc_metadata", {}).setdefault("runtime_config", {})
+        name = sc_node.name
+        for flag, key in [("init", "inits"), ("feed", "feeds"),
+                          ("target", "targets")]:
+            names = remaining_config[key]
+            node_runtime_config[flag] = name in names
+            names.discard(name)
+        node_runtime_config["fetch"] = fetches_by_name.pop(name, [])
 
     def add_sc_before_underscore(name):
         '''tf.import_graph_def() can't parse nodes with prefix "_",
         Add "sc" before "_".
         '''
-        obj = re.match("^_.*$", name)
-        if obj is not None:
+        if name[:1] == "_":
             name = "sc" + name
         return name
 
-    def add_sc_node(sc_graph, tf_node, name_to_node):
-        if sc_graph.get_node_by_name(node.name) is not None:
-            return
-        input_node_idxes = []
-        for input in tf_node.input:
-            if input.startswith("^"):
-                input_node_name = input[1:]
-                # check control edge name
-                input_node_name = add_sc_before_underscore(input_node_name)
-                if sc_graph.get_node_by_name(input_node_name) is not None:
-                    input_node = sc_graph.get_node_by_name(input_node_name)
-                else:
-                    add_sc_node(name_to_node[input_node_name])
-                    input_node = sc_graph.get_node_by_name(input_node_name)
-                index = -1
+    def add_sc_node(tf_node, input_node_idxes):
+        attrs = {}
+        for attr_name, attr_value in tf_node.attr.items():
+            if attr_name in _TYPE_ATTRS and attr_value.type:
+                attrs[attr_name] = _as_dtype(attr_value.type)
             else:
-                names = input.split(":")
-                assert len(names) == 1 or len(names) == 2
-                # check data edge name
-                names[0] = add_sc_before_underscore(names[0])
-                if sc_graph.get_node_by_name(names[0]) is not None:
-                    input_node = sc_graph.get_node_by_name(names[0])
-                else:
-                    add_sc_node(name_to_node[names[0]])
-                    input_node = sc_graph.get_node_by_name(names[0])
-                if len(names) == 1:
-                    index = 0
-                else:
-                    index = int(names[1])
-            input_node_idxes.append((input_node, index))
-        attrs = {
-            attr_name: __from_attr_proto(tf_node.attr[attr_name])
-            for attr_name in tf_node.attr
-        }
-        dtypes = __get_dtypes(tf_graph, tf_node)
+                attrs[attr_name] = __from_attr_proto(attr_value)
+        dtypes = __get_dtypes(get_op_def, tf_node)
         sc_node = sc_graph.add_node_and_edge(
-            tf_node.name, tf_op_map_to_sc_op(tf_graph._get_op_def(tf_node.op)),
+            tf_node.name, tf_op_map_to_sc_op(get_op_def(tf_node.op)[0]),
             input_node_idxes, len(dtypes), attrs)
         sc_node.attrs["tf"] = {}
         sc_node.attrs["tf"]["device"] = ""
         sc_node.attrs["tf"]["dtypes"] = dtypes
-        mark_runtime_info(sc_node, tf_runtime_config)
+        mark_runtime_info(sc_node, remaining_config)
         if tf_node.HasField("experimental_debug_info"):
             sc_node.attrs["tf"][
-                "experimental_debug_info"] = node.experimental_debug_info
+                "experimental_debug_info"] = tf_node.experimental_debug_info
+        return sc_node
 
     sc_graph = Graph()
-    tf_graph = tf.Graph()
+    get_op_def = __op_def_getter(tf.Graph())
     name_to_node = {}
     for node in tf_graph_def.node:
         node.name = add_sc_before_underscore(node.name)
         name_to_node[node.name] = node
 
+    # graph_def.node is normally topologically sorted, so every input is
+    # found in sc_by_name; otherwise the missing inputs are built first
+    # through an explicit stack instead of recursion
+    sc_by_name = {}
     for tf_node in tf_graph_def.node:
-        add_sc_node(sc_graph, tf_node, name_to_node)
-
-    for key in tf_runtime_config.keys():
-        for remaining in tf_runtime_config[key]:
+        if tf_node.name in sc_by_name:
+            continue
+        stack = [tf_node]
+        pending = {tf_node.name}
+        while stack:
+            curr_node = stack[-1]
+            inputs = [(add_sc_before_underscore(name), index)
+                      for name, index in map(__parse_tf_input,
+                                             curr_node.input)]
+            missing = [name for name, _ in inputs if name not in sc_by_name]
+            if missing:
+                if missing[0] in pending:
+                    logger().error("there is a cycle in graph: %s" %
+                                   (missing[0]))
+                    raise RuntimeError
+                if missing[0] not in name_to_node:
+                    logger().error("input %s of %s is not found in tf graph." %
+                                   (missing[0], curr_node.name))
+                    raise RuntimeError
+                pending.add(missing[0])
+                stack.append(name_to_node[missing[0]])
+                continue
+            stack.pop()
+            pending.remove(curr_node.name)
+            sc_by_name[curr_node.name] = add_sc_node(
+                curr_node, [(sc_by_name[name], index)
+                            for name, index in inputs])
+
+    remaining_config["fetches"] = [
+        name if index == -1 else "%s:%d" % (name, index)
+        for name, indexes in fetches_by_name.items() for index in indexes
+    ]
+    for key in remaining_config.keys():
+        for remaining in remaining_config[key]:
             logger().error(f"{remaining} is not found in tf graph.")
-        if len(tf_runtime_config[key]) > 0:
+        if len(remaining_config[key]) > 0:
             raise RuntimeError
 
     for key in ["versions", "library"]:
@@ -294,7 +435,8 @@ def __import_graph_from_tf_graph_def(tf_graph_def, tf_runtime_config):
             sc_graph.attrs[key] = getattr(tf_graph_def, key)
     sc_graph.attrs["meta_graph"] = tf.MetaGraphDef()
     sc_graph.attrs["initialized_variables"] = {}
-    sc_graph.attrs["lower_name_func"] = (lambda name: name.lower())
+    # a plain method rather than a lambda, so that graphs can be pickled
+    sc_graph.attrs["lower_name_func"] = str.lower
     return sc_graph
 
 
@@ -328,11 +470,113 @@ def get_tf_runtime_config(sc_graph):
     return tf_runtime_config
 
 
-def __sc_attrs_to_tf_attrs_proto(op_def, op_type_name, attrs):
+# python type of a sc attr value -> tf attr type, subclasses are resolved
+# through the mro so bool is never taken for int
+_SCALAR_ATTR_TYPE = {
+    str: "string",
+    bytes: "string",
+    float: "float",
+    bool: "bool",
+    int: "int",
+    tf.DType: "type",
+    tf.TensorShape: "shape",
+    tensor_pb2.TensorProto: "tensor",
+    tf.NameAttrList: "func",
+}
+
+# python type of the first element of a list sc attr value -> tf attr type
+_LIST_HEAD_TYPE = {
+    str: "list(string)",
+    bytes: "list(string)",
+    bool: "list(bool)",
+    int: "list(int)",
+    float: "list(float)",
+    tf.DType: "list(type)",
+    tf.TensorShape: "list(shape)",
+    tensor_pb2.TensorProto: "list(tensor)",
+}
+
+
+def __lookup_attr_type(type_map, value):
+    for value_type in type(value).__mro__:
+        attr_type = type_map.get(value_type)
+        if attr_type is not None:
+            return attr_type
+    return None
+
+
+# tf attr type -> (field of AttrValue or AttrValue.ListValue, maker of a
+# field value), a "list(...)" type uses the maker of its element type
+_ATTR_MAKERS = {
+    "string": ("s", lambda x, key, attr_def: _MakeStr(x, key)),
+    "int": ("i", lambda x, key, attr_def: _MakeInt(x, key)),
+    "float": ("f", lambda x, key, attr_def: _MakeFloat(x, key)),
+    "bool": ("b", lambda x, key, attr_def: _MakeBool(x, key)),
+    "type": ("type", lambda x, key, attr_def: _MakeType(x, attr_def)),
+    "shape": ("shape", lambda x, key, attr_def: _MakeShape(x, key)),
+    "tensor": ("tensor", lambda x, key, attr_def: _MakeTensor(x, key)),
+}
+
+
+def __check_allowed_string(s, attr_def, key, op_type_name):
+    if attr_def.HasField("allowed_values"):
+        if s not in attr_def.allowed_values.list.s:
+            logger().error(
+                "Attr '%s' of '%s' Op passed string '%s' not \
+                    in: \"%s\"." % (
+                    key,
+                    op_type_name,
+                    compat.as_text(s),
+                    '", "'.join(
+                        map(compat.as_text,
+                            attr_def.allowed_values.list.s)),
+                ))
+            raise ValueError
+
+
+def __set_attr_value(attr_value, value, key, attr_def, op_type_name):
+    '''write value into attr_value according to attr_def.type
+    '''
+    if attr_def.type == "func":
+        if isinstance(value, tf.NameAttrList):
+            attr_value.func.CopyFrom(value)
+        elif isinstance(value, compat.bytes_or_text_types):
+            attr_value.func.name = value
+        else:
+            value.add_to_graph(tf.get_default_graph())
+            attr_value.func.name = value.name
+        return
+    is_list = attr_def.type.startswith("list(")
+    element_type = attr_def.type[5:-1] if is_list else attr_def.type
+    if element_type not in _ATTR_MAKERS:
+        logger().error("Unrecognized Attr type " + attr_def.type)
+        raise TypeError
+    field, make = _ATTR_MAKERS[element_type]
+    if is_list:
+        getattr(attr_value.list, field).extend(
+            [make(x, key, attr_def) for x in value])
+    elif field in ("shape", "tensor"):
+        getattr(attr_value, field).CopyFrom(make(value, key, attr_def))
+    else:
+        setattr(attr_value, field, make(value, key, attr_def))
+
+    if element_type == "string":
+        for s in (attr_value.list.s if is_list else [attr_value.s]):
+            __check_allowed_string(s, attr_def, key, op_type_name)
+    elif attr_def.type == "int" and attr_def.has_minimum:
+        if attr_value.i < attr_def.minimum:
+            logger().error(
+                "Attr '%s' of '%s' Op passed %d less than minimum %d."
+                % (key, op_type_name, attr_value.i, attr_def.minimum))
+            raise ValueError
+
+
+def __sc_attrs_to_tf_attrs_proto(attr_defs, op_type_name, attrs):
     '''Convert attr values to AttrValue protos
+    Args:
+        attr_defs: dict, the attr defs of the op def by name
     '''
     attr_protos = {}
-    attr_defs = {attr_def.name: attr_def for attr_def in op_def.attr}
     for key, value in attrs.items():
         attr_value = tf.AttrValue()
         if key in attr_defs:
@@ -342,50 +586,17 @@ def __sc_attrs_to_tf_attrs_proto(op_def, op_type_name, attrs):
             continue
         else:
             attr_def = OpDef.AttrDef()
-            if isinstance(value, (str, bytes)):
-                attr_def.type = "string"
-            elif isinstance(value, float):
-                attr_def.type = "float"
-            elif isinstance(value, bool):
-                attr_def.type = "bool"
-            # bool is a subclass of int, so we should check bool
-            # before checking int
-            elif isinstance(value, int):
-                attr_def.type = "int"
-            elif isinstance(value, tf.DType):
-                attr_def.type = "type"
-            elif isinstance(value, tf.TensorShape):
-                attr_def.type = "shape"
-            elif isinstance(value, tensor_pb2.TensorProto):
-                attr_def.type = "tensor"
-            elif isinstance(value, tf.NameAttrList):
-                attr_def.type = "func"
-            elif isinstance(value, list) and len(value) == 0:
-                attr_value.list.SetInParent()
-                attr_protos[key] = attr_value
-                continue
-            elif isinstance(value, list) and isinstance(
-                    value[0], (str, bytes)):
-                attr_def.type = "list(string)"
-            elif isinstance(value, list) and isinstance(value[0], bool):
-                attr_def.type = "list(bool)"
-            # bool is a subclass of int, so we should check bool before
-            # checking int
-            elif isinstance(value, list) and isinstance(value[0], int):
-                attr_def.type = "list(int)"
-            elif isinstance(value, list) and isinstance(value[0], float):
-                attr_def.type = "list(float)"
-            elif isinstance(value, list) and isinstance(value[0], tf.DType):
-                attr_def.type = "list(type)"
-            elif isinstance(value, list) and isinstance(
-                    value[0], tf.TensorShape):
-                attr_def.type = "list(shape)"
-            elif isinstance(value, list) and isinstance(
-                    value[0], tensor_pb2.TensorProto):
-                attr_def.type = "list(tensor)"
-            else:
+            attr_type = __lookup_attr_type(_SCALAR_ATTR_TYPE, value)
+            if attr_type is None and isinstance(value, list):
+                if len(value) == 0:
+                    attr_value.list.SetInParent()
+                    attr_protos[key] = attr_value
+                    continue
+                attr_type = __lookup_attr_type(_LIST_HEAD_TYPE, value[0])
+            if attr_type is None:
                 logger().error(f"{value} has unsupported type")
                 raise RuntimeError
+            attr_def.type = attr_type
         if attr_def.HasField("default_value") and value is None:
             attr_value.CopyFrom(attr_def.default_value)
             attr_protos[key] = attr_value
@@ -402,87 +613,25 @@ def __sc_attrs_to_tf_attrs_proto(op_def, op_type_name, attrs):
                         (key, op_type_name, len(value), attr_def.minimum))
                     raise ValueError
             attr_value.list.SetInParent()
-        if attr_def.type == "string":
-            attr_value.s = _MakeStr(value, key)
-            if attr_def.HasField("allowed_values"):
-                if attr_value.s not in attr_def.allowed_values.list.s:
-                    logger().error(
-                        "Attr '%s' of '%s' Op passed string '%s' not \
-                            in: \"%s\"." % (
-                            key,
-                            op_type_name,
-                            compat.as_text(attr_value.s),
-                            '", "'.join(
-                                map(compat.as_text,
-                                    attr_def.allowed_values.list.s)),
-                        ))
-                    raise ValueError
-        elif attr_def.type == "list(string)":
-            attr_value.list.s.extend([_MakeStr(x, key) for x in value])
-            if attr_def.HasField("allowed_values"):
-                for x in attr_value.list.s:
-                    if x not in attr_def.allowed_values.list.s:
-                        logger().error(
-                            "Attr '%s' of '%s' Op passed string '%s' not \
-                                in: \"%s\"." % (
-                                key,
-                                op_type_name,
-                                compat.as_text(x),
-                                '", "'.join(
-                                    map(compat.as_text,
-                                        attr_def.allowed_values.list.s)),
-                            ))
-                        raise ValueError
-        elif attr_def.type == "int":
-            attr_value.i = _MakeInt(value, key)
-            if attr_def.has_minimum:
-                if attr_value.i < attr_def.minimum:
-                    logger().error(
-                        "Attr '%s' of '%s' Op passed %d less than minimum %d."
-                        % (key, op_type_name, attr_value.i, attr_def.minimum))
-                    raise ValueError
-        elif attr_def.type == "list(int)":
-            attr_value.list.i.extend([_MakeInt(x, key) for x in value])
-        elif attr_def.type == "float":
-            attr_value.f = _MakeFloat(value, key)
-        elif attr_def.type == "list(float)":
-            attr_value.list.f.extend([_MakeFloat(x, key) for x in value])
-        elif attr_def.type == "bool":
-            attr_value.b = _MakeBool(value, key)
-        elif attr_def.type == "list(bool)":
-            attr_value.list.b.extend([_MakeBool(x, key) for x in value])
-        elif attr_def.type == "type":
-            attr_value.type = _MakeType(value, attr_def)
-        elif attr_def.type == "list(type)":
-            attr_value.list.type.extend(
-                [_MakeType(x, attr_def) for x in value])
-        elif attr_def.type == "shape":
-            attr_value.shape.CopyFrom(_MakeShape(value, key))
-        elif attr_def.type == "list(shape)":
-            attr_value.list.shape.extend([_MakeShape(x, key) for x in value])
-        elif attr_def.type == "tensor":
-            attr_value.tensor.CopyFrom(_MakeTensor(value, key))
-        elif attr_def.type == "list(tensor)":
-            attr_value.list.tensor.extend([_MakeTensor(x, key) for x in value])
-        elif attr_def.type == "func":
-            if isinstance(value, tf.NameAttrList):
-                attr_value.func.CopyFrom(value)
-            elif isinstance(value, compat.bytes_or_text_types):
-                attr_value.func.name = value
-            else:
-                value.add_to_graph(tf.get_default_graph())
-                attr_value.func.name = value.name
-        else:
-            logger().error("Unrecognized Attr type " + attr_def.type)
-            raise TypeError
+        __set_attr_value(attr_value, value, key, attr_def, op_type_name)
 
         attr_protos[key] = attr_value
     return attr_protos
 
 
-def export_graph_to_tf_file(sc_graph, file_path=None):
+def export_graph_to_tf_file(sc_graph,
+                            file_path=None,
+                            infer_shapes=True,
+                            binary=False):
     '''convert sc graph to tf graph
     TODO(gbxu): the library file path should be configurable.
+    Args:
+        infer_shapes: import the graph into tf to add "_output_shapes" to
+            every node, which is the costliest step of the export. Nodes
+            created by parallelisms, e.g. allreduce, only get shapes here,
+            and the plan generator needs them.
+        binary: return the serialized GraphDef as bytes instead of pbtxt,
+            which is much faster to write and to parse back.
     '''
     proj_path = os.environ["SUPERSCLAR_PATH"]
     lib_path = proj_path + "/lib/libsuperscaler_pywrap.so"
@@ -492,6 +641,7 @@ def export_graph_to_tf_file(sc_graph, file_path=None):
         logger().error("The library file %s does not exist." % (lib_path))
         raise RuntimeError
     tf_graph = tf.Graph()
+    get_op_def = __op_def_getter(tf_graph)
     graph_def = tf_graph.as_graph_def(add_shapes=True)
     for key in ["versions", "library"]:
         if key in sc_graph.attrs:
@@ -509,26 +659,32 @@ def export_graph_to_tf_file(sc_graph, file_path=None):
         tf_node.device = sc_node.attrs["tf"]["device"]
         if "experimental_debug_info" in sc_node.attrs["tf"]:
             tf_node.experimental_debug_info.CopyFrom(
-                sc_node.attrs["experimental_debug_info"])
+                sc_node.attrs["tf"]["experimental_debug_info"])
+        _, attr_defs = get_op_def(tf_node.op)
         for name, attr_value in __sc_attrs_to_tf_attrs_proto(
-                tf_graph._get_op_def(tf_node.op), tf_node.op, attrs).items():
+                attr_defs, tf_node.op, attrs).items():
             tf_node.attr[name].CopyFrom(attr_value)
 
-        for in_edge in sc_node.in_edges:
-            if in_edge.src_idx == -1:
-                in_edge_str = f"^{in_edge.src_node.name}"
-            elif in_edge.src_idx == 0:
-                in_edge_str = f"{in_edge.src_node.name}"
-            else:
-                in_edge_str = f"{in_edge.src_node.name}:{in_edge.src_idx}"
-            tf_node.input.append(in_edge_str)
+        # one extend per node instead of one repeated-field append per edge
+        tf_node.input.extend([
+            "^" + in_edge.src_node.name if in_edge.src_idx == -1 else
+            in_edge.src_node.name if in_edge.src_idx == 0 else
+            "%s:%d" % (in_edge.src_node.name, in_edge.src_idx)
+            for in_edge in sc_node.in_edges
+        ])
     # add devices info
     __set_device_info(graph_def)
     # add shapes
-    output_graph = tf.Graph()
-    with output_graph.as_default():
-        tf.import_graph_def(graph_def, name="")
-    graph_def = output_graph.as_graph_def(add_shapes=True)
+    if infer_shapes:
+        output_graph = tf.Graph()
+        with output_graph.as_default():
+            tf.import_graph_def(graph_def, name="")
+        graph_def = output_graph.as_graph_def(add_shapes=True)
+    if binary:
+        graph_pb = graph_def.SerializeToString()
+        if file_path is not None:
+            Path(file_path).write_bytes(graph_pb)
+        return graph_pb
     # dump graph as pbtxt
     graph_pbtxt = google.protobuf.text_format.MessageToString(graph_def)
     if file_path is not None:
@@ -592,6 +748,23 @@ def import_tensorflow_model(session_run_params,
     return sc_graph
 
 
+def __set_dataset_paths_in_graph_def(tf_graph_def, paths):
+    '''replace the "DATASET_PATH:<idx>" string Consts with paths[idx].
+    '''
+    count = 0
+    for tf_node in tf_graph_def.node:
+        if tf_node.op != "Const" or "value" not in tf_node.attr:
+            continue
+        path_flag = tf_node.attr["value"].tensor.string_val
+        if len(path_flag) != 1:
+            continue
+        prefix, sep, idx = path_flag[0].partition(b':')
+        if sep and prefix == b'DATASET_PATH':
+            path_flag[0] = _MakeStr(paths[int(idx)], 'string_val')
+            count += 1
+    assert (count == len(paths))
+
+
 def set_dataset_paths(graph, paths):
     '''
     1. convert tf_graph string to sc graph.
@@ -601,19 +774,18 @@ def set_dataset_paths(graph, paths):
     '''
     tf_graph_def = tf.GraphDef()
     google.protobuf.text_format.Parse(graph, tf_graph_def)
-    count = 0
-    for tf_node in tf_graph_def.node:
-        if tf_node.op == "Const" and "value" in tf_node.attr:
-            path_flag = tf_node.attr["value"].tensor.string_val
-            if len(path_flag) != 1:
-                continue
-            path_flag = path_flag[0]
-            if len(path_flag.split(b':')) > 1 and path_flag.split(
-                    b':')[0] == b'DATASET_PATH':
-                idx = int(path_flag.split(b':')[1])
-                tf_node.attr["value"].tensor.string_val[0] = _MakeStr(
-                    paths[idx], 'string_val')
-                count += 1
-    assert (count == len(paths))
+    __set_dataset_paths_in_graph_def(tf_graph_def, paths)
     graph_pbtxt = google.protobuf.text_format.MessageToString(tf_graph_def)
     return graph_pbtxt
+
+
+def set_dataset_paths_binary(graph, paths):
+    '''set dataset paths of a serialized tf GraphDef.
+    Same as set_dataset_paths, without the text format round trip.
+    Return:
+        the serialized GraphDef
+    '''
+    tf_graph_def = tf.GraphDef()
+    tf_graph_def.ParseFromString(graph)
+    __set_dataset_paths_in_graph_def(tf_graph_def, paths)
+    return tf_graph_def.SerializeToString()
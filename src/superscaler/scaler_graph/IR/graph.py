@@ -64,7 +64,7 @@ class Graph:
                           attrs):
         '''Add a node into this graph, including all edges to it.
         '''
-        if self.get_node_by_name(node_name) is not None:
+        if node_name in self._name_to_node:
             logger().error("node %s is exising." % (node_name))
             raise RuntimeError
         self._STALE_COLLECTIONS = True
@@ -126,6 +126,63 @@ class Graph:
         sys.setrecursionlimit(1000000)
         return copy.deepcopy(self)
 
+    def shallow_copy(self):
+        '''Return a copy sharing attr values with this graph.
+        Nodes, edges, output tensors, ops, attr dicts and their nested "tf"
+        and "sc_metadata" dicts, e.g. the device, are new, so the copy can
+        be rewired and annotated on its own, while other attr values, e.g.
+        TensorProto constants, are shared by reference and must be
+        replaced rather than mutated in place.
+        '''
+        node_map = {}
+        tensor_map = {}
+        for node in self._nodes:
+            new_node = copy.copy(node)
+            new_node.op = copy.copy(node.op)
+            new_node.attrs = dict(node.attrs)
+            if "tf" in node.attrs:
+                new_node.attrs["tf"] = dict(node.attrs["tf"])
+            if "sc_metadata" in node.attrs:
+                # small nested dicts of per-node flags, e.g. runtime_config
+                new_node.attrs["sc_metadata"] = copy.deepcopy(
+                    node.attrs["sc_metadata"])
+            new_node._output_tensors = [
+                copy.copy(tensor) for tensor in node._output_tensors
+            ]
+            tensor_map.update(
+                zip(node._output_tensors, new_node._output_tensors))
+            node_map[node] = new_node
+        edge_map = {}
+        for edge in self._edges:
+            new_edge = copy.copy(edge)
+            new_edge.src_node = node_map[edge.src_node]
+            new_edge.dest_node = node_map[edge.dest_node]
+            edge_map[edge] = new_edge
+        for node, new_node in node_map.items():
+            new_node.in_edges = [
+                None if edge is None else edge_map[edge]
+                for edge in node.in_edges
+            ]
+            new_node.out_edges = [edge_map[edge] for edge in node.out_edges]
+            new_node._input_tensors = [
+                None if tensor is None else tensor_map[tensor]
+                for tensor in node._input_tensors
+            ]
+
+        graph = copy.copy(self)
+        graph._nodes = [node_map[node] for node in self._nodes]
+        graph._edges = [edge_map[edge] for edge in self._edges]
+        graph._attrs = dict(self._attrs)
+        graph._name_to_node = {
+            name: node_map[node]
+            for name, node in self._name_to_node.items()
+        }
+        graph._STALE_COLLECTIONS = True
+        graph._collections = {}
+        graph._STALE_ORDERED_NODES = True
+        graph._ordered_nodes = None
+        return graph
+
     def get_collection(self, collection_name):
         if not self._STALE_COLLECTIONS:
             return self._collections[collection_name]
@@ -1,7 +1,6 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import itertools
 from superscaler.scaler_graph.IR.node import CompositeNode
 from superscaler.scaler_graph.util.log import logger
 
@@ -10,39 +9,45 @@ def get_output_nodes(graph):
     '''get the nodes which have no output.
     They can be "fetch node".
     '''
-    upstream_nodes = set(
-        itertools.chain.from_iterable(
-            map(
-                lambda node: get_upstream_nodes(node),
-                graph.nodes,
-            )))
-    output_nodes = set(graph.nodes) - upstream_nodes
-    return output_nodes
+    has_consumer = set()
+    for node in graph.nodes:
+        for edge in node.in_edges:
+            if edge is not None:
+                has_consumer.add(edge.src_node)
+    return [node for node in graph.nodes if node not in has_consumer]
 
 
 def reverse_DFS(graph):
     '''get the orderd nodes via topological sort.
+    The DFS keeps an explicit stack, so deep graphs do not hit the
+    recursion limit.
     '''
-    output_nodes = get_output_nodes(graph)
+    visited = set()
     temp_nodes = set()
     ordered_nodes = []
-
-    def visit(current_node):
-        if current_node in ordered_nodes:
-            return
-        elif current_node in temp_nodes:
-            logger().error("there is a cycle in graph: %s" %
-                           (current_node.name))
-            raise RuntimeError
-        else:
+    for output_node in get_output_nodes(graph):
+        if output_node in visited:
+            continue
+        # (node, whether its input nodes have been pushed)
+        stack = [(output_node, False)]
+        while stack:
+            current_node, expanded = stack.pop()
+            if expanded:
+                temp_nodes.remove(current_node)
+                visited.add(current_node)
+                ordered_nodes.append(current_node)
+                continue
+            if current_node in visited:
+                continue
+            if current_node in temp_nodes:
+                logger().error("there is a cycle in graph: %s" %
+                               (current_node.name))
+                raise RuntimeError
             temp_nodes.add(current_node)
+            stack.append((current_node, True))
             for input_node in get_upstream_nodes(current_node):
-                visit(input_node)
-            temp_nodes.remove(current_node)
-            ordered_nodes.append(current_node)
-
-    for current_node in output_nodes:
-        visit(current_node)
+                if input_node not in visited:
+                    stack.append((input_node, False))
 
     return ordered_nodes
 
@@ -23,24 +23,29 @@ class DataParallelism(Parallelism):
 
     def run_on_graph(self, graph):
         # TODO(gbxu): add tags, delay graph manipulations
-        for node in graph.nodes:
-            if not isinstance(node.op, operator.ApplyOp):
-                continue
+        apply_nodes = [
+            node for node in graph.nodes
+            if isinstance(node.op, operator.ApplyOp)
+        ]
+        num_devices = str(len(self.devices))
+        for node in apply_nodes:
             edge = node.in_edges[node.op.info["gradient_index"]]
-            sc_op = operator.AllreduceOp()
-            input_node_idxes = []
-            input_node_idxes.append((edge.src_node, edge.src_idx))
-            attrs = {}
-            attrs["tensor_name"] = edge.src_node.name + "_allreduce"
-            attrs["T"] = edge.src_node.attrs["T"]
-            attrs["reduction"] = "sum"
-            attrs["num_devices"] = str(len(self.devices))
-            node_name = edge.src_node.name + "_allreduce"
+            src_node = edge.src_node
+            node_name = src_node.name + "_allreduce"
+            attrs = {
+                "tensor_name": node_name,
+                "T": src_node.attrs["T"],
+                "reduction": "sum",
+                "num_devices": num_devices,
+            }
             graph.remove_edge(edge)
-            node = graph.add_node_and_edge(node_name, sc_op, input_node_idxes,
-                                           1, attrs)
-            graph.add_edge(node, 0, edge.dest_node, edge.dest_idx)
-        self.parallel_graphs = []
-        for i in range(len(self.devices)):
-            self.parallel_graphs.append(graph.copy())
+            allreduce_node = graph.add_node_and_edge(
+                node_name, operator.AllreduceOp(),
+                [(src_node, edge.src_idx)], 1, attrs)
+            graph.add_edge(allreduce_node, 0, edge.dest_node, edge.dest_idx)
+        # replicas only differ in later per-device annotations, so they
+        # share attr values such as constants instead of copying them
+        self.parallel_graphs = [
+            graph.shallow_copy() for _ in range(len(self.devices))
+        ]
         return True
@@ -26,14 +26,15 @@ class Parallelizer:
 
     def run_parallelisms(self):
         for parallelism in self.parallelisms:
-            for graph in self.graphs:
-                if not parallelism.run_on_graph(graph):
-                    logger().error("failed when %s runs on a graph." %
-                                   (parallelism.__class__.__name__))
-                    raise RuntimeError
+            parallelism_name = type(parallelism).__name__
+            # stops at the first graph the parallelism fails on
+            if not all(
+                    parallelism.run_on_graph(graph) for graph in self.graphs):
+                logger().error("failed when %s runs on a graph." %
+                               (parallelism_name))
+                raise RuntimeError
             self.graphs = parallelism.parallel_graphs
-            logger().info("Run %s : successed." %
-                          (parallelism.__class__.__name__))
+            logger().info("Run %s : successed." % (parallelism_name))
 
         self.finalize()
 
@@ -204,9 +204,9 @@ class Superscaler(object):
                       indent=4,
                       sort_keys=True)
 
-            partition_graphs_path = os.path.join(tmp_rank_dir, 'graph.pbtxt')
+            partition_graphs_path = os.path.join(tmp_rank_dir, 'graph.pb')
             file = Path(partition_graphs_path)
-            file.write_text(self._partition_graphs[i])
+            file.write_bytes(self._partition_graphs[i])
 
     def run(self):
         """ A function that performs distributed training.
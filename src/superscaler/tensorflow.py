@@ -7,27 +7,59 @@ from superscaler.plan_gen import TFParser, PlanGenerator, SuperScalerAdapter
 from superscaler.runtime.util import distribute_resources, launch
 import tensorflow as tf
 import argparse
-from functools import wraps
+import multiprocessing
+from functools import partial, wraps
 
 
 @wraps(tf.data.TFRecordDataset)
 def TFRecordDataset(*args, **kwargs):
+    # placeholders are set on new objects, the caller's filenames are kept
     if "filenames" in kwargs:
-        for i, _ in enumerate(kwargs["filenames"]):
-            kwargs["filenames"][i] = "DATASET_PATH:" + str(i)
+        kwargs["filenames"] = [
+            "DATASET_PATH:%d" % i for i in range(len(kwargs["filenames"]))
+        ]
     else:
         assert (len(args) > 0)
-        args_copy = list(args)
-        args_copy[0] = "DATASET_PATH:0"
-    return tf.data.TFRecordDataset(*args_copy, **kwargs)
+        args = ("DATASET_PATH:0", ) + args[1:]
+    return tf.data.TFRecordDataset(*args, **kwargs)
+
+
+def _export_partition_graphs(graphs, processes=1, export=None):
+    """ Export sc graphs into serialized tf GraphDefs, keeping their order.
+
+    Args:
+      graphs: list of sc graphs.
+      processes: number of worker processes, 1 exports in this process.
+        Workers are spawned rather than forked: forking a process where
+        tensorflow is already initialized is not safe. Each worker imports
+        tensorflow again and the calling script must guard its entry point
+        with `if __name__ == "__main__"`, so this only pays off for large
+        graphs.
+      export: picklable function exporting one graph, defaults to
+        tf_adapter.export_graph_to_tf_file with binary=True.
+    """
+    if export is None:
+        export = partial(tf_adapter.export_graph_to_tf_file, binary=True)
+    processes = min(processes, len(graphs))
+    if processes <= 1:
+        return [export(graph) for graph in graphs]
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        return pool.map(export, graphs)
 
 
 class tensorflow(Superscaler):
     """ Wrapper class for the Superscaler API for tensorflow framework. """
 
-    def __init__(self):
+    def __init__(self, export_processes=1):
+        """
+        Args:
+          export_processes: number of processes exporting partition graphs,
+            see _export_partition_graphs. 1, the default, exports them in
+            this process.
+        """
         super().__init__()
         self._plan_parser = TFParser()
+        self._export_processes = export_processes
 
     def _init_partition_graphs(self, session_run_params, strategy):
         """ A function that partition tensorflow graph by parallelism strategy.
@@ -44,17 +76,18 @@ class tensorflow(Superscaler):
                 ) or "run_params" not in session_run_params.keys():
             raise SuperscalerError('session_run_params must be a dict with \
                     keys "init_params" and "run_params".')
-        for node in session_run_params["init_params"]:
-            if not isinstance(node, tf.Operation):
-                raise SuperscalerError(
-                    'nodes in session_run_params["init_params"] \
-                        must be tf.Operation')
-        for node in session_run_params["run_params"]:
-            if not isinstance(node, tf.Operation) and not isinstance(
-                    node, tf.Tensor):
-                raise SuperscalerError(
-                    'nodes in session_run_params["run_params"] must be \
-                    tf.Operation or tf.Tensor')
+        if not all(
+                isinstance(node, tf.Operation)
+                for node in session_run_params["init_params"]):
+            raise SuperscalerError(
+                'nodes in session_run_params["init_params"] \
+                    must be tf.Operation')
+        if not all(
+                isinstance(node, (tf.Operation, tf.Tensor))
+                for node in session_run_params["run_params"]):
+            raise SuperscalerError(
+                'nodes in session_run_params["run_params"] must be \
+                tf.Operation or tf.Tensor')
         if not isinstance(strategy, DataParallelism):
             raise SuperscalerError("Unsupport parallelism strategy")
 
@@ -65,12 +98,11 @@ class tensorflow(Superscaler):
         parallelizer.register_parallelism(strategy)
         parallelizer.run_parallelisms()
 
-        # Convert partition_graphs into tf_protobuf
-        self._partition_graphs = []
-        for graph in parallelizer.graphs:
-            self._partition_graphs.append(
-                tf_adapter.export_graph_to_tf_file(graph))
-        self._graph_count = len(parallelizer.graphs)
+        # Convert partition_graphs into serialized tf_protobuf
+        graphs = parallelizer.graphs
+        self._graph_count = len(graphs)
+        self._partition_graphs = _export_partition_graphs(
+            graphs, self._export_processes)
         self._graph_config = tf_adapter.get_tf_runtime_config(merged_sc_graph)
 
     def _init_communication_plan(self, resource_pool, communication_DSL):
@@ -88,7 +120,7 @@ class tensorflow(Superscaler):
 
         # init plan_generator
         self._resoure_pool.init_from_yaml(resource_pool)
-        devices = ["device_" + str(i) for i in range(self._graph_count)]
+        devices = ["device_%d" % i for i in range(self._graph_count)]
         nodelist = self._plan_parser.parse_graphs(
             self._partition_graphs, devices, load_from_memory=True)
 
@@ -106,12 +138,12 @@ class tensorflow(Superscaler):
         """
         update dataset path in graph
         """
-        for i, (graph, plan) in enumerate(
-                zip(self._partition_graphs, self._assigned_plan)):
-            if plan['ip'] in dataset_paths.keys():
+        for i, plan in enumerate(self._assigned_plan):
+            if plan['ip'] in dataset_paths:
                 paths = dataset_paths[plan['ip']].pop()
-                new_graph = tf_adapter.set_dataset_paths(graph, paths)
-                self._partition_graphs[i] = new_graph
+                self._partition_graphs[i] = \
+                    tf_adapter.set_dataset_paths_binary(
+                        self._partition_graphs[i], paths)
 
     def run(self, args):
         """ A function that performs distributed training.
@@ -119,11 +151,18 @@ class tensorflow(Superscaler):
         """
 
         if self.is_initialized() is True:
+            # read every argument once, a missing one is illegal as well
+            try:
+                steps, interval, print_info, print_fetches_targets = (
+                    args.steps, args.interval, args.print_info,
+                    args.print_fetches_targets)
+            except AttributeError:
+                raise SuperscalerError("Superscaler runtime argument illegal")
             if not isinstance(args, argparse.Namespace) or\
-               not isinstance(args.steps, int) or\
-               not isinstance(args.interval, int) or\
-               not isinstance(args.print_info, bool) or\
-               not isinstance(args.print_fetches_targets, bool):
+               not isinstance(steps, int) or\
+               not isinstance(interval, int) or\
+               not isinstance(print_info, bool) or\
+               not isinstance(print_fetches_targets, bool):
                 raise SuperscalerError("Superscaler runtime argument illegal")
 
             deployment_config, rank2ip =\
@@ -131,20 +170,19 @@ class tensorflow(Superscaler):
             remote_resource_dir = distribute_resources(deployment_config,
                                                        self._working_dir)
             print(remote_resource_dir)
+            # Only the rank differs between workers, so the constant flags
+            # are formatted once
+            cmd_prefix = ('python -m superscaler.runtime.tensorflow.runner '
+                          '--model_dir_prefix {}/'.format(remote_resource_dir))
+            cmd_suffix = (' --steps {} '
+                          '--interval {} '
+                          '--print_info {} '
+                          '--print_fetches_targets {} '.format(
+                              steps, interval, print_info,
+                              print_fetches_targets))
             cmd_per_worker = [
-                'python -m superscaler.runtime.tensorflow.runner '
-                '--model_dir_prefix {resource_dir}/{grank} '
-                '--steps {steps} '
-                '--interval {interval} '
-                '--print_info {print_info} '
-                '--print_fetches_targets {print_fetches_targets} '
-                .format(resource_dir=remote_resource_dir,
-                        grank=grank,
-                        steps=args.steps,
-                        interval=args.interval,
-                        print_info=args.print_info,
-                        print_fetches_targets=args.print_fetches_targets)
-                for grank, _ in enumerate(rank2ip)
+                cmd_prefix + str(grank) + cmd_suffix
+                for grank in range(len(rank2ip))
             ]
             launch(rank2ip, cmd_per_worker)
         else:
@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import subprocess
+import pytest
+
+
+@pytest.fixture(scope="session")
+def gpu_available():
+    """
+        Check NVIDIA with nvidia-smi -L, once per test session
+        Returning code == 0 and listing any GPU, it means NVIDIA is
+        installed and GPU is available for running
+        Other means not installed
+    """
+    try:
+        result = subprocess.run(['nvidia-smi', '-L'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    # one "GPU <index>: <name> (UUID: ...)" line per GPU, MIG devices are
+    # listed indented below their GPU
+    return any(line.startswith(b'GPU ')
+               for line in result.stdout.splitlines())
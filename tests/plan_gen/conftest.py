@@ -0,0 +1,22 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import os
+import pytest
+from superscaler.plan_gen.plan.resources.resource_pool import ResourcePool
+from superscaler.plan_gen.plan.parser.tf_parser import TFParser
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+@pytest.fixture
+def resource_pool():
+    """A fresh ResourcePool of data/resource_pool.yaml for each test"""
+    rp = ResourcePool()
+    rp.init_from_yaml(os.path.join(DATA_DIR, 'resource_pool.yaml'))
+    return rp
+
+
+@pytest.fixture(scope="session")
+def tf_parser():
+    return TFParser()
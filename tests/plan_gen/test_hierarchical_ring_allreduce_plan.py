@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import json
+import os
+from superscaler.plan_gen.plan import hierarchical_ring_allreduce_plan
+from superscaler.plan_gen.plan import ring_allreduce_plan
+
+
+def get_nodes(device_count):
+    return [{'device': 'device_%d' % (i),
+             'name': 'test',
+             'op': 'Allreduce',
+             'output_shapes': [[1, 100]],
+             'tensor_name': 'test',
+             'tensor_type': 'DT_FLOAT',
+             'input': []} for i in range(device_count)]
+
+
+def test_hierarchical_ring_allreduce_plan():
+
+    hierarchical_ring = \
+        hierarchical_ring_allreduce_plan.HierarchicalRingAllreducePlan(
+            plan_name='hierarchical_ring')
+    # Test get_plan_info() function
+    assert(hierarchical_ring.get_plan_info() ==
+           ('Allreduce', 'hierarchical_ring'))
+
+    # Test None input
+    hierarchical_ring.reset_node_list(None)
+    assert(hierarchical_ring.generate_plan() is None)
+
+    # Devices on a single host fall back to the flat ring
+    path_input = os.path.join(os.path.dirname(__file__),
+                              "data/test_input_nodes.json")
+    nodes = json.load(open(path_input, 'r'))
+    hierarchical_ring.reset_node_list(nodes)
+    output_plan = hierarchical_ring.generate_plan()
+    path_output = os.path.join(os.path.dirname(__file__),
+                               "data/test_ring_allreduce_output_ref.json")
+    output_ref = json.load(open(path_output, 'r'))
+    assert(output_plan.to_json() == output_ref)
+
+    # Two hosts with two devices each
+    device_hosts = {'device_0': 'hostname1', 'device_1': 'hostname1',
+                    'device_2': 'hostname2', 'device_3': 'hostname2'}
+    hierarchical_ring = \
+        hierarchical_ring_allreduce_plan.HierarchicalRingAllreducePlan(
+            plan_name='hierarchical_ring', device_hosts=device_hosts)
+    hierarchical_ring.reset_node_list(get_nodes(4))
+    output_plan = hierarchical_ring.generate_plan().to_json()
+
+    # Each rank runs 1 local and 1 inter-host step for both scatter and
+    # allgather, each step holding a Send and a Recv
+    assert(len(output_plan) == 4 * 8)
+    assert([node['name'] for node in output_plan[:8]] == [
+        'test_local_scatter_send_0', 'test_local_scatter_recv_0',
+        'test_inter_scatter_send_0', 'test_inter_scatter_recv_0',
+        'test_inter_allgather_send_0', 'test_inter_allgather_recv_0',
+        'test_local_allgather_send_0', 'test_local_allgather_recv_0'])
+
+    # Every Send is paired with a Recv of the same chunk on its target
+    recvs = {(node['device'], node['name']): node
+             for node in output_plan if node['op'] == 'Recv'}
+    for node in output_plan:
+        if node['op'] == 'Send':
+            recv = recvs[(node['target'], node['related_op'])]
+            assert(recv['target'] == node['device'])
+            assert(recv['related_op'] == node['name'])
+            assert((recv['offset'], recv['size']) ==
+                   (node['offset'], node['size']))
+
+    # Only half of the gradients crosses hosts compared with flat ring
+    def get_inter_host_size(plan, device_hosts):
+        return sum(node['size'] for node in plan if node['op'] == 'Send' and
+                   device_hosts[node['device']] !=
+                   device_hosts[node['target']])
+
+    ring = ring_allreduce_plan.RingAllreducePlan(plan_name='ring')
+    ring.reset_node_list(get_nodes(4))
+    ring_plan = ring.generate_plan().to_json()
+    assert(get_inter_host_size(output_plan, device_hosts) == 200)
+    assert(get_inter_host_size(ring_plan, device_hosts) == 300)
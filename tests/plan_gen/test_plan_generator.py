@@ -5,53 +5,38 @@
 
 import os
 import json
-from superscaler.plan_gen.plan.parser.tf_parser import TFParser
-from superscaler.plan_gen.plan.resources.resource_pool import ResourcePool
 from superscaler.plan_gen.plan.plan_generator import PlanGenerator
 
-TEST_DB = os.path.join(
-    os.path.dirname(__file__), 'data/tf_parser_testbench/profile_db.json')
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+TEST_DB = os.path.join(DATA_DIR, 'tf_parser_testbench/profile_db.json')
 
 
-def test_plan_generator():
+def test_plan_generator(tf_parser, resource_pool):
 
     # Test for a simple graph with only two allreduce nodes
     def get_device(device_count):
         return ["device_%d" % (i) for i in range(device_count)]
 
     def get_graph_paths(path, device_count):
-        graph_paths = []
-        for i in range(device_count):
-            sub_path = os.path.join(path, "run_" + str(i) + ".pbtxt")
-            graph_paths.append(sub_path)
-        return graph_paths
+        return [os.path.join(path, "run_%d.pbtxt" % i)
+                for i in range(device_count)]
 
     device_count = 2
-    parser = TFParser()
     devices = get_device(device_count)
     graph_paths = get_graph_paths(
-        os.path.join(
-            os.path.dirname(__file__),
-            "data/DataParallelismPlan2GPUsIn2Hosts"),
+        os.path.join(DATA_DIR, "DataParallelismPlan2GPUsIn2Hosts"),
         device_count)
-    parser = TFParser()
-    nodelist = parser.parse_graphs(graph_paths, devices)
-
-    # Init ResourcePool
-    resource_yaml_path = os.path.join(
-        os.path.dirname(__file__), 'data', 'resource_pool.yaml')
-    rp = ResourcePool()
-    rp.init_from_yaml(resource_yaml_path)
+    nodelist = tf_parser.parse_graphs(graph_paths, devices)
 
     # Init PlanManager by PlanPool and PlanMapper
-    plan_generator = PlanGenerator(nodelist, rp)
+    plan_generator = PlanGenerator(nodelist, resource_pool)
 
     # Check the correctness of output
     plan_ring = plan_generator.get_execution_plan('Allreduce', 'ring')
-    output_path = os.path.join(
-        os.path.dirname(__file__), "data/ring_simple.json")
+    output_path = os.path.join(DATA_DIR, "ring_simple.json")
 
-    output_ref = json.load(open(output_path, 'r'))
+    with open(output_path, 'rb') as f:
+        output_ref = json.loads(f.read())
     assert(plan_ring.to_json() == output_ref)
 
     route_info = plan_generator.get_routing_info()
@@ -82,3 +67,21 @@ def test_plan_generator():
          'name': '/server/hostname1/GPU/3/',
          'type': 'GPU'}
     ]
+    # Links and devices info are generated once, changing the returned
+    # lists does not change later results
+    device_info[0]['type'] = 'GPU'
+    device_info.pop()
+    assert plan_generator.get_device_info()[0]['type'] == 'CPU'
+    assert len(plan_generator.get_device_info()) == 6
+    links_info = plan_generator.get_links_info()
+    assert links_info == resource_pool.get_links_as_list()
+    links_info[0]['latency'] = -1
+    links_info.clear()
+    assert plan_generator.get_links_info() == \
+        resource_pool.get_links_as_list()
+
+    # Both devices are mapped on GPUs of hostname1, so the hierarchical
+    # ring falls back to the flat ring plan
+    plan_hierarchical_ring = plan_generator.get_execution_plan(
+        'Allreduce', 'hierarchical_ring')
+    assert(plan_hierarchical_ring.to_json() == output_ref)
@@ -4,24 +4,17 @@
 import json
 import os
 import pytest
-from superscaler.plan_gen.plan.resources.resource_pool import ResourcePool
 from superscaler.plan_gen.plan.plan_mapper import GPURoundRobinMapper
 from superscaler.plan_gen.plan.plan_pool import PlanPool
 from superscaler.plan_gen.plan.plan import Plan
 from superscaler.plan_gen.plan.plan_manager import PlanManager
 
 
-def test_plan_manager():
+def test_plan_manager(resource_pool):
 
     def Init_PlanMapper():
-        # Init resouce_pool
-        resource_yaml_path = os.path.join(
-            os.path.dirname(__file__), 'data', 'resource_pool.yaml')
-        rp = ResourcePool()
-        rp.init_from_yaml(resource_yaml_path)
-
         # Init PlanMapper by resouce_pool
-        mapper = GPURoundRobinMapper(rp)
+        mapper = GPURoundRobinMapper(resource_pool)
         return mapper
 
     def Init_PlanPool():
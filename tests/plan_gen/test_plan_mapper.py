@@ -4,17 +4,14 @@
 import os
 import json
 from superscaler.plan_gen.plan.node_list import NodeList
-from superscaler.plan_gen.plan.plan_mapper import GPURoundRobinMapper
+from superscaler.plan_gen.plan.plan_mapper import GPURoundRobinMapper, \
+    LoadAwareGPURoundRobinMapper
 from superscaler.plan_gen.plan.resources.resource_pool import ResourcePool
 
 
-def test_gpu_round_robin():
+def test_gpu_round_robin(resource_pool):
     # Init mapper
-    resource_yaml_path = os.path.join(
-        os.path.dirname(__file__), 'data', 'resource_pool.yaml')
-    rp = ResourcePool()
-    rp.init_from_yaml(resource_yaml_path)
-    mapper = GPURoundRobinMapper(rp)
+    mapper = GPURoundRobinMapper(resource_pool)
 
     # Test map function
     path_input = os.path.join(os.path.dirname(__file__),
@@ -101,3 +98,51 @@ def test_gpu_round_robin():
     node_list = NodeList(node_list)
     mapped_node_list = mapper.map(node_list)
     assert(mapped_node_list is None)
+
+
+def test_load_aware_gpu_round_robin(resource_pool):
+    # Init mapper
+    mapper = LoadAwareGPURoundRobinMapper(resource_pool)
+
+    # Same mapping as GPURoundRobinMapper when GPUs are enough
+    path_input = os.path.join(os.path.dirname(__file__),
+                              "data/test_generated_plan.json")
+    node_list = NodeList(json.load(open(path_input, 'r')))
+    path_output = os.path.join(os.path.dirname(__file__),
+                               "data/test_mapped_plan.json")
+    mappeded_node_list_ref = json.load(open(path_output, 'r'))
+    assert(mapper.map(node_list).to_json() == mappeded_node_list_ref)
+
+    # Assign 5 devices into 4 GPUs
+    node_list = NodeList([{"device": "device_%d" % (i),
+                           "name": "test_%d" % (i),
+                           "op": "Conv2D",
+                           "input": []} for i in range(5)])
+    assert(mapper.map(node_list) is None)
+
+    # The most loaded device goes to the fastest GPU, communication nodes
+    # do not count in the load
+    resource_yaml_path = os.path.join(
+        os.path.dirname(__file__), 'data', 'resource_pool_heterogeneous.yaml')
+    rp = ResourcePool()
+    rp.init_from_yaml(resource_yaml_path)
+    mapper = LoadAwareGPURoundRobinMapper(rp)
+    node_list = NodeList([
+        {"device": "device_0", "name": "conv_0", "op": "Conv2D",
+         "input": [], "execution_time": 4.0},
+        {"device": "device_1", "name": "conv_1", "op": "Conv2D",
+         "input": [], "execution_time": 1.0},
+        {"device": "device_1", "name": "allreduce_1", "op": "Allreduce",
+         "input": [], "execution_time": 10.0}])
+    mapped_node_list = mapper.map(node_list)
+    assert([node.device for node in mapped_node_list] == [
+        '/server/hostname1/GPU/1/', '/server/hostname1/GPU/0/',
+        '/server/hostname1/GPU/0/'])
+    assert({device: gpu.get_name()
+            for device, gpu in mapper.map_devices(node_list).items()} ==
+           {'device_0': '/server/hostname1/GPU/1/',
+            'device_1': '/server/hostname1/GPU/0/'})
+    # Round robin ignores the load
+    assert([node.device for node in GPURoundRobinMapper(rp).map(node_list)]
+           == ['/server/hostname1/GPU/0/', '/server/hostname1/GPU/1/',
+               '/server/hostname1/GPU/1/'])
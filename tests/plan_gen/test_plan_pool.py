@@ -42,3 +42,29 @@ def test_plan_pool():
     assert(PlanPool.has_plan(Default_plan) is False)
     assert(PlanPool.get_plan(plan_type, plan_name) is None)
     assert(PlanPool.get_plan_list(plan_type=plan_type) == [])
+
+    # Test register_plan(), plan is built on its first get_plan()
+    built = []
+
+    def factory():
+        built.append(Test_plan)
+        return Test_plan
+
+    PlanPool.register_plan(plan_type, 'Test_Plan', factory)
+    assert(PlanPool.has_plan(Test_plan) is True)
+    assert(built == [])
+    assert(PlanPool.get_plan(plan_type, 'Test_Plan') is Test_plan)
+    assert(PlanPool.get_plan(plan_type, 'Test_Plan') is Test_plan)
+    assert(built == [Test_plan])
+    assert(PlanPool.get_plan_list(plan_type=plan_type) == [Test_plan])
+    assert(PlanPool.delete_plan(Test_plan) is True)
+    assert(PlanPool.has_plan(Test_plan) is False)
+
+    # Test delete_plan() and reset() on plans not built yet
+    PlanPool.register_plan(plan_type, 'Test_Plan', factory)
+    assert(PlanPool.delete_plan(Test_plan) is True)
+    assert(PlanPool.delete_plan(Test_plan) is False)
+    PlanPool.register_plan(plan_type, 'Test_Plan', factory)
+    PlanPool.reset()
+    assert(PlanPool.has_plan(Test_plan) is False)
+    assert(built == [Test_plan])
@@ -1,18 +1,12 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
-import os
 import pytest
 
-from superscaler.plan_gen.plan.resources.resource_pool import ResourcePool
 
-
-def test_resource_pool_functionality():
-    resource_yaml_path = os.path.join(
-        os.path.dirname(__file__), 'data', 'resource_pool.yaml')
-    rp = ResourcePool()
+def test_resource_pool_functionality(resource_pool):
     # Test yaml parser
-    rp.init_from_yaml(resource_yaml_path)
+    rp = resource_pool
 
     # Test get_servers
     servers = rp.get_servers()
@@ -32,3 +32,28 @@ def test_ring_allreduce_plan():
                                "data/test_ring_allreduce_output_ref.json")
     output_ref = json.load(open(path_output, 'r'))
     assert(output_plan.to_json() == output_ref)
+
+    # Test segmented ring, each 50-element chunk is split into 5 segments
+    segmented_ring = ring_allreduce_plan.RingAllreducePlan(
+        plan_name='segmented_ring', segment_bytes=40)
+    segmented_ring.reset_node_list(nodes)
+    output_plan = segmented_ring.generate_plan().to_json()
+    assert(len(output_plan) == 2 * 2 * 5 * 2)
+    device_0_nodes = [node for node in output_plan
+                      if node['device'] == 'device_0']
+    assert([(node['name'], node['offset'], node['size'])
+            for node in device_0_nodes[:4]] ==
+           [('test_scatter_send_0_0', 0, 10),
+            ('test_scatter_recv_0_0', 50, 10),
+            ('test_scatter_send_0_1', 10, 10),
+            ('test_scatter_recv_0_1', 60, 10)])
+    # A segment only depends on the same segment of the previous step
+    assert(device_0_nodes[11]['name'] == 'test_allgather_recv_0_0')
+    assert(device_0_nodes[10]['input'] == ['test_scatter_recv_0_0'])
+    assert(device_0_nodes[11]['input'] == ['test_allgather_send_0_0'])
+
+    # Chunks smaller than a segment are not split
+    segmented_ring = ring_allreduce_plan.RingAllreducePlan(
+        plan_name='ring', segment_bytes=1 << 20)
+    segmented_ring.reset_node_list(nodes)
+    assert(segmented_ring.generate_plan().to_json() == output_ref)
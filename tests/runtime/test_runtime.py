@@ -5,11 +5,11 @@ import os
 import pytest
 import multiprocessing
 import traceback
-import subprocess
 from superscaler.runtime.runtime import Runtime
 
-father_path = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), "../../"))
+TEST_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.join(TEST_DIR, "data")
+father_path = os.path.abspath(os.path.join(TEST_DIR, "../../"))
 lib_path = os.path.abspath(os.path.join(os.environ["SUPERSCLAR_PATH"],
                                         "lib/libsuperscaler_pywrap.so"))
 
@@ -26,12 +26,7 @@ def test_runtime_import():
         rt.shutdown()
 
     # Init path location
-    plan_path_0 = "data/plan_0.json"
-    plan_path_0 = os.path.join(os.path.dirname(__file__),
-                               plan_path_0)
-    plan_path_1 = "data/plan_1.json"
-    plan_path_1 = os.path.join(os.path.dirname(__file__),
-                               plan_path_1)
+    plan_path_0 = os.path.join(DATA_DIR, "plan_0.json")
 
     # Check wrong lib_path
     with pytest.raises(Exception):
@@ -44,9 +39,7 @@ def test_runtime_import():
 
     # Check fake library
     with pytest.raises(Exception):
-        fake_lib_path = "libMySharedLib.so"
-        fake_lib_path = os.path.join(os.path.dirname(__file__),
-                                     fake_lib_path)
+        fake_lib_path = os.path.join(TEST_DIR, "libMySharedLib.so")
         rt = Runtime(plan_path_0, fake_lib_path)
         rt.shutdown()
 
@@ -73,28 +66,10 @@ class Process(multiprocessing.Process):
         return self._exception
 
 
-def is_gpu_available():
-    """
-        Check NVIDIA with nvidia-smi command
-        Returning code == 0 and count > 0, it means NVIDIA is installed
-        and GPU is available for running
-        Other means not installed
-    """
-    code = os.system('nvidia-smi')
-    if code == 0:
-        cmd = "nvidia-smi --query-gpu=name --format=csv,noheader | wc -l"
-        count = subprocess.check_output(cmd, shell=True)
-        return int(count) > 0
-    else:
-        return False
-
-
-def test_runtime():
+def test_runtime(gpu_available):
     def func(rank):
         try:
-            plan_path = 'data/plan_' + rank + '.json'
-            plan_path = os.path.join(os.path.dirname(__file__),
-                                     plan_path)
+            plan_path = os.path.join(DATA_DIR, 'plan_' + rank + '.json')
 
             # Check for init
             rt = Runtime(plan_path, lib_path)
@@ -106,12 +81,13 @@ def test_runtime():
             raise Exception
 
     # All backend codes must run on gpu environment with cuda support
-    if is_gpu_available() is True:
+    if gpu_available:
+        # start both ranks before joining, so they initialize concurrently
         p0 = Process(target=func, args=('0', ))
-        p0.start()
-        p0.join()
         p1 = Process(target=func, args=('1', ))
+        p0.start()
         p1.start()
+        p0.join()
         p1.join()
 
         if p0.exception:
@@ -3,25 +3,10 @@
 
 import os
 import pytest
-import subprocess
 from superscaler.runtime.tensorflow.runtime import TFRuntime
 import tensorflow as tf
 
-
-def is_gpu_available():
-    """
-        Check NVIDIA with nvidia-smi command
-        Returning code == 0 and count > 0, it means NVIDIA is installed
-        and GPU is available for running
-        Other means not installed
-    """
-    code = os.system('nvidia-smi')
-    if code == 0:
-        cmd = "nvidia-smi --query-gpu=name --format=csv,noheader | wc -l"
-        count = subprocess.check_output(cmd, shell=True)
-        return int(count) > 0
-    else:
-        return False
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 
 
 def test_tfruntime_import():
@@ -36,17 +21,14 @@ def test_tfruntime_import():
         rt.shutdown()
 
 
-def test_tfruntime():
+def test_tfruntime(gpu_available):
     # All backend codes must run on gpu environment with cuda support
-    if is_gpu_available() is True:
+    if gpu_available:
 
         # Init path location
-        graph_path = os.path.join(os.path.dirname(__file__),
-                                  "data/graph.pbtxt")
-        graph_config_path = os.path.join(os.path.dirname(__file__),
-                                         "data/model_desc.json")
-        plan_path = os.path.join(os.path.dirname(__file__),
-                                 "data/plan.json")
+        graph_path = os.path.join(DATA_DIR, "graph.pbtxt")
+        graph_config_path = os.path.join(DATA_DIR, "model_desc.json")
+        plan_path = os.path.join(DATA_DIR, "plan.json")
         lib_path = os.path.abspath(os.path.join(
             os.environ["SUPERSCLAR_PATH"],
             "lib/libsuperscaler_pywrap.so"))
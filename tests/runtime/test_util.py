@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import io
+import sys
+import subprocess
+import pytest
+from superscaler.runtime import util
+
+
+def test_stream_shell_cmd(monkeypatch):
+    # A text-only stdout gets decoded lines
+    out = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', out)
+    util.stream_shell_cmd(
+        [sys.executable, '-c', 'print("a"); print("b")'])
+    assert(out.getvalue().splitlines() == ['a', 'b'])
+
+    # A failing stdout must not stop the pipe from being drained, otherwise
+    # the child blocks on a full pipe and the call never returns
+    class BrokenStdout(io.StringIO):
+        def write(self, text):
+            raise TypeError
+
+    monkeypatch.setattr(sys, 'stdout', BrokenStdout())
+    util.stream_shell_cmd(
+        [sys.executable, '-c', 'print("x" * (1 << 20))'])
+
+    with pytest.raises(subprocess.CalledProcessError):
+        util.stream_shell_cmd([sys.executable, '-c', 'exit(3)'])
+
+
+def test_rsync_one(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        returncode = 23 if cmd[-1].startswith('bad') else 0
+        return subprocess.CompletedProcess(cmd, returncode, b'',
+                                           b'rsync: connection refused\n')
+
+    monkeypatch.setattr(util.subprocess, 'run', fake_run)
+    assert(util._rsync_one('localhost', '/tmp/src', '/tmp/dst') ==
+           ('localhost', 0))
+    assert(calls[-1][-2:] == ['/tmp/src', '/tmp/dst'])
+    assert(util._rsync_one('10.0.0.1', '/tmp/src', '/tmp/dst') ==
+           ('10.0.0.1', 0))
+    assert(calls[-1][-1] == '10.0.0.1:/tmp/dst')
+
+    # The failed sync keeps rsync's own reason
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        util._rsync_one('bad', '/tmp/src', '/tmp/dst')
+    assert(e.value.returncode == 23)
+    assert(e.value.stderr == 'rsync: connection refused\n')
+
+
+def test_launch(monkeypatch):
+    calls = []
+    monkeypatch.delenv('SLURM_JOB_ID', raising=False)
+    monkeypatch.setattr(util, 'stream_shell_cmd',
+                        lambda cmd, env=None: calls.append(cmd))
+
+    # Contiguous ranks running one cmd collapse into a single -H host:slots
+    util.launch(['10.0.0.1', '10.0.0.1', '10.0.0.2'],
+                ['python train.py --lr 0.1'] * 3)
+    assert(calls[-1] == [
+        'mpirun', '--allow-run-as-root', '--tag-output',
+        '-H', '10.0.0.1:2,10.0.0.2:1', '-np', '3',
+        'python', 'train.py', '--lr', '0.1'
+    ])
+
+    # Interleaved ranks fall back to one app context per rank
+    util.launch(['10.0.0.1', '10.0.0.2', '10.0.0.1'],
+                ['python train.py'] * 3)
+    assert(calls[-1] == [
+        'mpirun', '--allow-run-as-root', '--tag-output',
+        '-np', '1', '-host', '10.0.0.1:2', 'python', 'train.py', ':',
+        '-np', '1', '-host', '10.0.0.2:1', 'python', 'train.py', ':',
+        '-np', '1', '-host', '10.0.0.1:2', 'python', 'train.py'
+    ])
+
+    # So do different cmds, even on contiguous ranks
+    util.launch(['10.0.0.1', '10.0.0.1'], ['python a.py', 'python b.py'])
+    assert(calls[-1] == [
+        'mpirun', '--allow-run-as-root', '--tag-output',
+        '-np', '1', '-host', '10.0.0.1:2', 'python', 'a.py', ':',
+        '-np', '1', '-host', '10.0.0.1:2', 'python', 'b.py'
+    ])
+
+
+def test_srun_launch(monkeypatch):
+    calls = []
+
+    # The temporary files only live during the srun call
+    def fake_stream_shell_cmd(cmd, env=None):
+        with open(cmd[-1]) as multi_prog, \
+                open(env['SLURM_HOSTFILE']) as host_file:
+            calls.append((cmd, multi_prog.read(), host_file.read()))
+
+    monkeypatch.setenv('SLURM_JOB_ID', '42')
+    monkeypatch.setattr(util, '_slurm_hostnames', lambda: {'node1', 'node2'})
+    monkeypatch.setattr(util, 'stream_shell_cmd', fake_stream_shell_cmd)
+    util.launch(['node1', 'node2', 'node1'],
+                ['python a.py --rank 0', 'python b.py', 'python a.py'])
+
+    assert(len(calls) == 1)
+    cmd, multi_prog, host_file = calls[0]
+    assert(cmd[:-1] == ['srun', '--mpi=pmix', '--ntasks', '3',
+                        '--distribution', 'arbitrary', '--multi-prog'])
+    assert(multi_prog == '0 python a.py --rank 0\n'
+                         '1 python b.py\n'
+                         '2 python a.py\n')
+    assert(host_file == 'node1\nnode2\nnode1\n')
+
+
+def test_launch_in_slurm_allocation_by_ip(monkeypatch):
+    calls = []
+    monkeypatch.setenv('SLURM_JOB_ID', '42')
+    monkeypatch.setattr(util, '_slurm_hostnames', lambda: {'node1'})
+    monkeypatch.setattr(util, 'stream_shell_cmd',
+                        lambda cmd, env=None: calls.append(cmd))
+
+    # srun only accepts allocation node names, localhost keeps mpirun
+    util.launch(['localhost'], ['python train.py'])
+    assert(calls == [[
+        'mpirun', '--allow-run-as-root', '--tag-output',
+        '-H', 'localhost:1', '-np', '1', 'python', 'train.py'
+    ]])
+
+    # Without scontrol the allocation is unknown, keep mpirun as well
+    monkeypatch.setattr(util, '_slurm_hostnames', lambda: set())
+    util.launch(['node1'], ['python train.py'])
+    assert(calls[-1][0] == 'mpirun')
@@ -28,6 +28,33 @@ def test_graph_io():
     assert (json.loads(file.read_text()) == json.loads(sc_graph.json()))
 
 
+def test_graph_io_binary(tmp_path):
+    '''test:
+        cache a binary sidecar of the tf pbtxt file;
+        import sc graph from the sidecar and from the binary file;
+    '''
+    data_path = os.path.join(os.path.dirname(__file__), "data/matmul")
+    tf_pbtxt_path = tmp_path / "MatmulRun.pbtxt"
+    tf_pbtxt_path.write_text(
+        Path(os.path.join(data_path, "MatmulRun.pbtxt")).read_text())
+    config_file = os.path.join(data_path, "MatmulRun_model_desc.json")
+    expected = json.loads(
+        Path(os.path.join(data_path, "MatmulRun.json")).read_text())
+
+    for _ in range(2):
+        tf_runtime_config = json.loads(Path(config_file).read_text())
+        sc_graph = tf_adapter.import_graph_from_tf_pbtxts(
+            [str(tf_pbtxt_path)], tf_runtime_config, cache_binary=True)
+        assert (json.loads(sc_graph.json()) == expected)
+    tf_pb_path = tmp_path / "MatmulRun.pbtxt.pb"
+    assert (tf_pb_path.exists())
+
+    tf_runtime_config = json.loads(Path(config_file).read_text())
+    sc_graph = tf_adapter.import_graph_from_tf_pb([str(tf_pb_path)],
+                                                  tf_runtime_config)
+    assert (json.loads(sc_graph.json()) == expected)
+
+
 def test_remove_nodes():
     '''test:
         remove node and edge
@@ -75,3 +102,27 @@ def test_insert_node():
                      "data/matmul", "MatmulRunAllreduce.json")
     file = Path(inserted_allreduce_file)
     assert (file.read_text() == sc_graph.json())
+
+
+def test_shallow_copy():
+    tf_pbtxt_path = os.path.join(os.path.dirname(__file__), "data/matmul",
+                                 "MatmulRun.pbtxt")
+    config_file = os.path.join(os.path.dirname(__file__), "data/matmul",
+                               "MatmulRun_model_desc.json")
+    tf_runtime_config = json.loads(Path(config_file).read_text())
+    sc_graph = tf_adapter.import_graph_from_tf_pbtxts([tf_pbtxt_path],
+                                                      tf_runtime_config)
+    graph_copy = sc_graph.shallow_copy()
+    assert (graph_copy.json() == sc_graph.json())
+    node, node_copy = sc_graph.nodes[-1], graph_copy.nodes[-1]
+    assert (node_copy is not node)
+    assert (node_copy.attrs is not node.attrs)
+    node_copy.attrs["tf"]["device"] = "/device:GPU:1"
+    assert (node.attrs["tf"]["device"] != "/device:GPU:1")
+    node_copy.attrs["sc_metadata"]["runtime_config"]["target"] = True
+    assert (node.attrs["sc_metadata"]["runtime_config"]["target"] is False)
+    assert (all(edge.dest_node is node_copy for edge in node_copy.in_edges
+                if edge is not None))
+    graph_copy.remove_node_and_edge(node_copy)
+    assert (len(graph_copy.nodes) == len(sc_graph.nodes) - 1)
+    assert (graph_copy.json() != sc_graph.json())
@@ -45,3 +45,17 @@ def test_tf_adapter():
             test_tf_graph_def.SerializeToString(),  # expected
             curr_tf_graph_def.SerializeToString())  # actual
         assert (len(diff) == 0)
+
+        # Skipping shape inference keeps the same nodes and edges
+        raw_tf_graph_def = tf.GraphDef()
+        raw_tf_graph_def.ParseFromString(
+            tf_adapter.export_graph_to_tf_file(merged_sc_graph,
+                                               infer_shapes=False,
+                                               binary=True))
+
+        def node_signature(graph_def):
+            return sorted((node.name, node.op, list(node.input), node.device)
+                          for node in graph_def.node)
+
+        assert (node_signature(raw_tf_graph_def) ==
+                node_signature(curr_tf_graph_def))
@@ -4,31 +4,35 @@
 import os
 import json
 import pytest
-import subprocess
 import argparse
-from superscaler.scaler_graph import DataParallelism
+from superscaler.scaler_graph import DataParallelism, Parallelizer, tf_adapter
+from superscaler.scaler_graph.IR.graph import Graph
 from scaler_graph.tf_example import dummy_model
 import superscaler.tensorflow as superscaler
 from superscaler.superscaler import SuperscalerError
 
 
-def is_gpu_available():
-    """
-        Check NVIDIA with nvidia-smi command
-        Returning code == 0 and count > 0, it means NVIDIA is installed
-        and GPU is available for running
-        Other means not installed
-    """
-    code = os.system('nvidia-smi')
-    if code == 0:
-        cmd = "nvidia-smi --query-gpu=name --format=csv,noheader | wc -l"
-        count = subprocess.check_output(cmd, shell=True)
-        return int(count) > 0
-    else:
-        return False
-
-
-def test_superscaler_tf():
+def test_export_partition_graphs():
+    # Runs without GPU: Graph.json stands in for the tf export, which needs
+    # the superscaler library, so the spawned pool is checked on its own
+    tf_pbtxt_path = os.path.join(os.path.dirname(__file__), "scaler_graph",
+                                 "data/simple_cnn", "SimpleCNN.pbtxt")
+    tf_runtime_config = {"feeds": [], "fetches": ["cross_entropy:0"],
+                         "inits": ["init"], "targets": ["GradientDescent"]}
+    sc_graph = tf_adapter.import_graph_from_tf_pbtxts([tf_pbtxt_path],
+                                                      tf_runtime_config)
+    parallelizer = Parallelizer(sc_graph)
+    parallelizer.register_parallelism(DataParallelism(range(2)))
+    parallelizer.run_parallelisms()
+    graphs = parallelizer.graphs
+    expected = [graph.json() for graph in graphs]
+    assert(superscaler._export_partition_graphs(
+        graphs, 1, export=Graph.json) == expected)
+    assert(superscaler._export_partition_graphs(
+        graphs, 2, export=Graph.json) == expected)
+
+
+def test_superscaler_tf(gpu_available):
 
     # Create Superscaler_TF class
     sc = superscaler()
@@ -50,7 +54,7 @@ def test_superscaler_tf():
     args.print_info = True
     args.print_fetches_targets = True
 
-    if is_gpu_available():
+    if gpu_available:
         # Check for wrong input
         with pytest.raises(SuperscalerError):
             # Wrong session_run_params
@@ -101,8 +105,8 @@ def test_superscaler_tf():
             model_desc_ref = json.load(open(model_desc_path, 'r'))
             assert(model_desc_ref == sc._graph_config)
 
-            graph_path = os.path.join(tmp_rank_dir, 'graph.pbtxt')
-            graph_ref = open(graph_path, 'r').read()
+            graph_path = os.path.join(tmp_rank_dir, 'graph.pb')
+            graph_ref = open(graph_path, 'rb').read()
             assert(graph_ref == sc._partition_graphs[i])
 
         # illegal args input
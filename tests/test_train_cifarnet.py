@@ -3,30 +3,13 @@
 
 import os
 import json
-import subprocess
 import argparse
 from superscaler.scaler_graph import DataParallelism
 from training import cifarnet
 import superscaler.tensorflow as superscaler
 
 
-def is_gpu_available():
-    """
-        Check NVIDIA with nvidia-smi command
-        Returning code == 0 and count > 0, it means NVIDIA is installed
-        and GPU is available for running
-        Other means not installed
-    """
-    code = os.system('nvidia-smi')
-    if code == 0:
-        cmd = "nvidia-smi --query-gpu=name --format=csv,noheader | wc -l"
-        count = subprocess.check_output(cmd, shell=True)
-        return int(count) > 0
-    else:
-        return False
-
-
-def test_train_cifarnet():
+def test_train_cifarnet(gpu_available):
     # Create Superscaler_TF class
     sc = superscaler()
 
@@ -48,7 +31,7 @@ def test_train_cifarnet():
     args.print_info = True
     args.print_fetches_targets = True
 
-    if is_gpu_available():
+    if gpu_available:
         # Init Superscaler_TF class
         sc.init(session_run_params, deployment_setting, strategy,
                 communication_DSL, resource_pool, dataset_paths)
@@ -76,8 +59,8 @@ def test_train_cifarnet():
             model_desc_ref = json.load(open(model_desc_path, 'r'))
             assert (model_desc_ref == sc._graph_config)
 
-            graph_path = os.path.join(tmp_rank_dir, 'graph.pbtxt')
-            graph_ref = open(graph_path, 'r').read()
+            graph_path = os.path.join(tmp_rank_dir, 'graph.pb')
+            graph_ref = open(graph_path, 'rb').read()
             assert (graph_ref == sc._partition_graphs[i])
 
         # final run